@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'POA.settings')
+# As conexões com o banco sob ASGI vêm do pool (DATABASES em settings)
+os.environ['POA_ASGI'] = '1'
 
 application = get_asgi_application()
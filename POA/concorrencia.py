@@ -0,0 +1,88 @@
+"""
+Consultas independentes de uma view assíncrona executadas ao mesmo tempo.
+
+As chamadas assíncronas do ORM (aget, acount...) passam todas pela mesma
+thread, então não se sobrepõem. Com o pool de conexões (o padrão sob ASGI)
+cada função roda numa thread do executor, com uma conexão emprestada do pool,
+e o tempo total fica limitado pela consulta mais lenta. Sem o pool cada thread
+abriria uma conexão nova, mais cara que as contagens paralelizadas, então as
+funções rodam em sequência na conexão da requisição.
+
+executar_em_segundo_plano() roda um trabalho longo (como a importação de
+alunos) numa thread à parte, sem segurar a requisição que o iniciou.
+"""
+import asyncio
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connections
+
+from POA.consultas import propagar_medicao
+
+
+logger = logging.getLogger(__name__)
+
+
+def _em_transacao():
+    """Dados ainda não confirmados na conexão da requisição não são visíveis às outras"""
+    return any(conexao.in_atomic_block for conexao in connections.all(initialized_only=True))
+
+
+def _em_paralelo():
+    """Só vale abrir outras conexões se vierem do pool e fora de uma transação"""
+    if not connections['default'].settings_dict['OPTIONS'].get('pool'):
+        return False
+    return not _em_transacao()
+
+
+def _isolada(funcao):
+    def executar():
+        # Mesmo ciclo de uma requisição: a conexão da thread volta ao pool ao
+        # final e é descartada se estiver inutilizável
+        close_old_connections()
+        try:
+            with propagar_medicao():
+                return funcao()
+        finally:
+            close_old_connections()
+    return executar
+
+
+async def executar_concorrentes(*funcoes):
+    """
+    Executa as funções síncronas (cada uma com suas consultas) em paralelo e
+    devolve os resultados na mesma ordem. Sem o pool ou dentro de uma
+    transação, como nos testes, elas rodam em sequência na conexão da
+    requisição.
+    """
+    if not await sync_to_async(_em_paralelo)():
+        return [await sync_to_async(funcao)() for funcao in funcoes]
+    return await asyncio.gather(*(
+        sync_to_async(_isolada(funcao), thread_sensitive=False)() for funcao in funcoes
+    ))
+
+
+def executar_em_segundo_plano(funcao, *args):
+    """
+    Inicia funcao(*args) numa thread à parte e volta sem esperar por ela. A
+    thread fecha as próprias conexões ao terminar (ou as devolve ao pool).
+    Dentro de uma transação, como nos testes, a função roda na hora, na
+    conexão da requisição.
+
+    A thread vive no processo do servidor: se ele for reiniciado no meio do
+    trabalho, o que faltava não é feito.
+    """
+    if _em_transacao():
+        funcao(*args)
+        return
+
+    def executar():
+        try:
+            funcao(*args)
+        except Exception:
+            logger.exception('Falha no trabalho em segundo plano %s', funcao.__name__)
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=executar, daemon=True).start()
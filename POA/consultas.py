@@ -0,0 +1,83 @@
+"""
+Medição das consultas SQL de cada requisição: quantidade, tempo total e
+consultas idênticas repetidas (o sintoma típico de N+1), comparadas com o
+orçamento declarado para a rota em settings.ORCAMENTO_CONSULTAS.
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+# A partir de quantas execuções da mesma consulta ela é tratada como N+1
+LIMITE_REPETICOES = 3
+
+# Medições ativas no contexto atual, para as threads que executam consultas
+# em nome da requisição (POA.concorrencia)
+_medicoes_ativas = ContextVar('medicoes_ativas', default=())
+
+
+def orcamento_da_rota(nome_rota):
+    """Orçamento declarado para a rota ('app:nome'), ou o padrão"""
+    orcamentos = getattr(settings, 'ORCAMENTO_CONSULTAS', {})
+    return orcamentos.get(nome_rota, getattr(settings, 'ORCAMENTO_CONSULTAS_PADRAO', 20))
+
+
+class MedicaoConsultas:
+    """
+    Registra as consultas executadas dentro do bloco em todas as conexões.
+    A assinatura de cada consulta é o SQL antes dos parâmetros, então a mesma
+    consulta repetida com ids diferentes conta como repetição.
+    """
+
+    def __init__(self):
+        self.assinaturas = Counter()
+        self.total = 0
+        self.tempo = 0.0
+        self._pilha = []
+        self._trava = threading.Lock()
+        self._token = None
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self._trava:
+                self.tempo += time.perf_counter() - inicio
+                self.total += 1
+                self.assinaturas[sql] += 1
+
+    def __enter__(self):
+        for conexao in connections.all():
+            wrapper = conexao.execute_wrapper(self)
+            wrapper.__enter__()
+            self._pilha.append(wrapper)
+        self._token = _medicoes_ativas.set(_medicoes_ativas.get() + (self,))
+        return self
+
+    def __exit__(self, *exc):
+        _medicoes_ativas.reset(self._token)
+        while self._pilha:
+            self._pilha.pop().__exit__(*exc)
+
+    @property
+    def repetidas(self):
+        """{sql: vezes} das consultas executadas LIMITE_REPETICOES vezes ou mais"""
+        return {sql: vezes for sql, vezes in self.assinaturas.items() if vezes >= LIMITE_REPETICOES}
+
+    def resumo(self):
+        return f"{self.total} consulta(s) em {self.tempo * 1000:.1f} ms"
+
+
+@contextmanager
+def propagar_medicao():
+    """Registra também as consultas das conexões desta thread nas medições ativas"""
+    with ExitStack() as pilha:
+        for medicao in _medicoes_ativas.get():
+            for conexao in connections.all():
+                pilha.enter_context(conexao.execute_wrapper(medicao))
+        yield
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 load_dotenv()
@@ -40,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'POA',
     'pessoas',
     'academico',
@@ -48,24 +50,48 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'contas.middleware.OrcamentoConsultasMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'contas.middleware.PerfilUsuarioMiddleware',
     'contas.middleware.PapelRequiredMiddleware',
     'contas.middleware.LoginRequiredMiddleware',
 ]
 
+# Orçamento de consultas SQL por rota: medido em desenvolvimento pelo
+# OrcamentoConsultasMiddleware e exigido pelos testes de cada app
+MEDIR_CONSULTAS = os.getenv('MEDIR_CONSULTAS', '1' if DEBUG else '0') == '1'
+ORCAMENTO_CONSULTAS_PADRAO = 10
+ORCAMENTO_CONSULTAS = {
+    'dashboard': 12,
+    'academico:dashboard': 10,
+    'academico:gerenciar_alunos_turma': 14,
+    'academico:meu_boletim': 12,
+    'academico:minhas_turmas_professor': 10,
+    # Inclui a abertura da chamada do dia na primeira visita
+    'academico:fazer_chamada_professor': 16,
+}
+
 ROOT_URLCONF = 'POA.urls'
 
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR/'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Templates compilados ficam em memória; em DEBUG são recarregados
+            # quando o arquivo muda
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
@@ -91,9 +117,56 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST', 'db'),
         'PORT': os.getenv('DB_PORT'),
+        # Conexão persistente (só sob WSGI): reaproveitada entre requisições
+        # por até DB_CONN_MAX_AGE segundos e testada antes do reuso
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        'OPTIONS': {},
     }
 }
 
+# Sob ASGI o Django roda o código síncrono de cada requisição numa thread
+# própria (ThreadSensitiveContext) e a conexão é da thread: a persistente nunca
+# seria reaproveitada e ficaria aberta na thread descartada. Ali o padrão é o
+# pool de conexões do próprio Django (psycopg 3), que também fornece as
+# conexões das consultas concorrentes dos dashboards (POA.concorrencia).
+SERVIDOR_ASGI = os.getenv('POA_ASGI') == '1'
+
+if os.getenv('DB_POOL', '1' if SERVIDOR_ASGI else '0') == '1':
+    # O pool substitui a conexão persistente, que precisa ficar desligada
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN', '2')),
+        'max_size': int(os.getenv('DB_POOL_MAX', '10')),
+        'timeout': int(os.getenv('DB_POOL_TIMEOUT', '10')),
+    }
+elif SERVIDOR_ASGI:
+    # Sem o pool, uma conexão nova por requisição, fechada ao final dela
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
+
+# Cache
+# Com REDIS_URL todos os processos (workers do uvicorn, réplicas) usam o mesmo
+# cache: a trava e a validade do retrato dos dashboards (academico.estatisticas),
+# as versões de perfil (contas.perfil) e o andamento das importações de alunos
+# (contas.importacao) valem para todos eles. Sem REDIS_URL o cache é local de
+# cada processo: cada worker recalcula o retrato por conta própria e só
+# enxerga as invalidações feitas por ele mesmo, o que só serve para
+# desenvolvimento ou para um único processo.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -133,6 +206,24 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# O collectstatic grava cada arquivo com o hash do conteúdo no nome, mais as
+# versões .gz, e o WhiteNoise os entrega com cache imutável e Content-Encoding
+# conforme o Accept-Encoding. Sem o manifesto (collectstatic ausente ou com
+# falha) as páginas dão erro em vez de sair com nomes sem hash.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Desenvolvimento e testes rodam sem collectstatic: os arquivos vêm direto de
+# STATICFILES_DIRS, com o nome original
+if DEBUG or sys.argv[1:2] == ['test']:
+    STORAGES['staticfiles']['BACKEND'] = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
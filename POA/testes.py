@@ -0,0 +1,52 @@
+"""Apoio aos testes: exige o orçamento de consultas de cada rota"""
+from django.urls import URLPattern, reverse
+
+from POA.consultas import MedicaoConsultas, orcamento_da_rota
+
+
+class OrcamentoConsultasMixin:
+    """
+    Para TestCase: faz GET em cada rota de um módulo de urls e falha se ela
+    passar de settings.ORCAMENTO_CONSULTAS ou repetir a mesma consulta.
+    """
+
+    def medir_rota(self, user, nome_rota, kwargs=None, query=''):
+        self.client.force_login(user)
+        url = reverse(nome_rota, kwargs=kwargs) + query
+        with MedicaoConsultas() as medicao:
+            resposta = self.client.get(url)
+        return resposta, medicao
+
+    def assertDentroDoOrcamento(self, user, nome_rota, kwargs=None, query=''):
+        resposta, medicao = self.medir_rota(user, nome_rota, kwargs, query)
+        self.assertLess(resposta.status_code, 400, f'{nome_rota} respondeu {resposta.status_code}')
+
+        orcamento = orcamento_da_rota(nome_rota)
+        self.assertLessEqual(
+            medicao.total, orcamento,
+            f'{nome_rota} passou do orçamento de {orcamento}: {medicao.resumo()}'
+        )
+        self.assertEqual(
+            medicao.repetidas, {},
+            f'{nome_rota} repete consultas (N+1): ' + '; '.join(
+                f'{vezes}x {sql}' for sql, vezes in medicao.repetidas.items()
+            )
+        )
+        return medicao
+
+    def assertRotasNoOrcamento(self, modulo_urls, usuario_padrao, usuarios=None, argumentos=None):
+        """
+        Mede todas as rotas nomeadas do módulo. `usuarios` e `argumentos`
+        informam, por nome de rota, quem acessa e os kwargs/querystring usados.
+        """
+        usuarios = usuarios or {}
+        argumentos = argumentos or {}
+        prefixo = f'{modulo_urls.app_name}:' if getattr(modulo_urls, 'app_name', None) else ''
+
+        for padrao in modulo_urls.urlpatterns:
+            if not isinstance(padrao, URLPattern) or not padrao.name:
+                continue
+            nome_rota = prefixo + padrao.name
+            kwargs, query = argumentos.get(nome_rota, ({}, ''))
+            with self.subTest(rota=nome_rota):
+                self.assertDentroDoOrcamento(usuarios.get(nome_rota, usuario_padrao), nome_rota, kwargs, query)
@@ -13,12 +13,18 @@ class TurmaAdmin(admin.ModelAdmin):
     list_filter = ['ativa', 'ano_letivo', 'serie', 'periodo', 'professor']
     search_fields = ['nome']
     filter_horizontal = ['disciplinas']
+    list_select_related = ['professor__papel__pessoa']
+    ordering = ['nome', 'id']
+    show_full_result_count = False
 
 @admin.register(Matricula)
 class MatriculaAdmin(admin.ModelAdmin):
     list_display = ['aluno', 'turma', 'data_matricula', 'situacao', 'ativa']
     list_filter = ['ativa', 'situacao', 'turma', 'data_matricula']
     search_fields = ['aluno__papel__pessoa__nome', 'turma__nome']
+    list_select_related = ['aluno__papel__pessoa', 'turma']
+    ordering = ['aluno__papel__pessoa__nome', 'id']
+    show_full_result_count = False
 
 
 
@@ -27,9 +33,22 @@ class NotaAdmin(admin.ModelAdmin):
     list_display = ['aluno', 'disciplina', 'turma', 'bimestre', 'nota', 'data_lancamento']
     list_filter = ['bimestre', 'disciplina', 'turma']
     search_fields = ['aluno__papel__pessoa__nome', 'disciplina__nome']
+    list_select_related = ['aluno__papel__pessoa', 'disciplina', 'turma']
+    show_full_result_count = False
+
+@admin.register(Boletim)
+class BoletimAdmin(admin.ModelAdmin):
+    list_display = ['aluno', 'turma', 'disciplina', 'nota_1', 'nota_2', 'nota_3', 'nota_4', 'media', 'atualizado_em']
+    list_filter = ['turma', 'disciplina']
+    search_fields = ['aluno__papel__pessoa__nome']
+    list_select_related = ['aluno__papel__pessoa', 'disciplina', 'turma']
+    ordering = ['aluno__papel__pessoa__nome', 'id']
+    show_full_result_count = False
 
 @admin.register(Frequencia)
 class FrequenciaAdmin(admin.ModelAdmin):
     list_display = ['aluno', 'turma', 'mes', 'ano', 'total_aulas', 'total_presencas', 'total_faltas', 'percentual_presenca']
     list_filter = ['turma', 'mes', 'ano']
-    search_fields = ['aluno__papel__pessoa__nome']
\ No newline at end of file
+    search_fields = ['aluno__papel__pessoa__nome']
+    list_select_related = ['aluno__papel__pessoa', 'turma']
+    show_full_result_count = False
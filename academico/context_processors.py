@@ -1,10 +1,6 @@
-from pessoas.models import Papel
+from contas.perfil import obter_perfil
 
 def tipo_papel(request):
     if request.user.is_authenticated:
-        try:
-            papel = Papel.objects.get(pessoa__user=request.user, ativo=True)
-            return {'tipo_papel': papel.tipo}
-        except Papel.DoesNotExist:
-            pass
+        return {'tipo_papel': obter_perfil(request).tipo_principal}
     return {'tipo_papel': None}
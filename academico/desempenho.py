@@ -0,0 +1,353 @@
+"""
+Medição de latência das telas principais sobre uma escola gerada.
+
+Cada cenário é uma tela acessada por um papel (coordenador, professor ou
+aluno). As requisições passam pelo cliente de testes do Django, ou seja, por
+todo o caminho de middlewares, views e templates, sem a rede. Com asgi=True
+elas passam pelo ASGIHandler, como sob o uvicorn: o código síncrono de cada
+requisição roda numa thread própria, com a conexão dela. O resultado é um
+dicionário serializável em JSON para comparar commits.
+
+medir_conexoes() isola o custo de abrir (ou reaproveitar) a conexão com o
+banco em cada requisição, nos modos suportados por settings.DATABASES.
+"""
+import asyncio
+import copy
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import django
+from django.core.handlers.asgi import ASGIHandler
+from django.core.signals import request_finished, request_started
+from django.db import connection, connections
+from django.db.utils import load_backend
+from django.test import Client
+from django.urls import reverse
+
+from POA.consultas import MedicaoConsultas, propagar_medicao
+from pessoas.models import Papel
+from .models import Matricula, Turma
+
+# (nome, papel, rota, como a turma medida é passada: kwarg, '?parametro' ou None)
+CENARIOS = [
+    ('dashboard_coordenador', 'coordenador', 'dashboard', None),
+    ('dashboard_professor', 'professor', 'dashboard', None),
+    ('dashboard_aluno', 'aluno', 'dashboard', None),
+    ('listar_alunos', 'coordenador', 'academico:listar_alunos', None),
+    ('chamada', 'professor', 'academico:fazer_chamada_professor', 'turma_id'),
+    ('diario_professor', 'professor', 'academico:diario_professor', '?turma'),
+    ('meu_boletim', 'aluno', 'academico:meu_boletim', None),
+    ('minha_frequencia', 'aluno', 'academico:minha_frequencia', None),
+]
+
+
+def participantes_da_escola():
+    """
+    Primeira turma com alunos, uma disciplina e um professor dela, um aluno
+    matriculado nela e o coordenador
+    """
+    turma = Turma.objects.filter(total_alunos__gt=0).order_by('pk').first()
+    if turma is None:
+        raise ValueError('Nenhuma turma com alunos; gere a escola antes de medir.')
+    disciplina = turma.disciplinas.select_related('professor__papel__pessoa').first()
+    matricula = Matricula.objects.filter(turma=turma).select_related('aluno__papel__pessoa').first()
+    return {
+        'turma': turma,
+        'disciplina': disciplina,
+        'aluno_info': matricula.aluno,
+        'professor': disciplina.professor.papel.pessoa.user,
+        'aluno': matricula.aluno.papel.pessoa.user,
+        'coordenador': Papel.objects.filter(tipo=Papel.COORDENADOR).select_related('pessoa').first().pessoa.user,
+    }
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por interpolação linear entre as amostras ordenadas"""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return None
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+
+def _url(rota, turma, argumento):
+    if argumento is None:
+        return reverse(rota)
+    if argumento.startswith('?'):
+        return reverse(rota) + f'{argumento}={turma.pk}'
+    return reverse(rota, kwargs={argumento: turma.pk})
+
+
+class RespostaAsgi:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class ClienteAsgi:
+    """
+    Envia GETs pelo ASGIHandler, com os cookies (a sessão) de um Client já
+    autenticado. O ASGIHandler, diferente do AsyncClient dos testes, abre um
+    ThreadSensitiveContext por requisição, como no deploy.
+    """
+
+    def __init__(self, cliente):
+        self.cookies = cliente.cookies
+        self.handler = ASGIHandler()
+        # Um laço próprio, e não async_to_sync: chamado de uma thread síncrona,
+        # o async_to_sync faria o código síncrono da view voltar para ela
+        self.laco = asyncio.new_event_loop()
+        self._propagacao = None
+
+    def get(self, url):
+        # Os sinais da requisição rodam na thread dela: as consultas das
+        # conexões dessa thread entram nas medições ativas (MedicaoConsultas)
+        request_started.connect(self._comecar)
+        request_finished.connect(self._terminar)
+        try:
+            return self.laco.run_until_complete(self._get(url))
+        finally:
+            request_started.disconnect(self._comecar)
+            request_finished.disconnect(self._terminar)
+
+    def _comecar(self, **kwargs):
+        self._propagacao = propagar_medicao()
+        self._propagacao.__enter__()
+
+    def _terminar(self, **kwargs):
+        if self._propagacao is not None:
+            self._propagacao.__exit__(None, None, None)
+            self._propagacao = None
+
+    async def _get(self, url):
+        caminho, _, parametros = url.partition('?')
+        cookies = '; '.join(f'{nome}={morsel.value}' for nome, morsel in self.cookies.items())
+        escopo = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': caminho,
+            'raw_path': caminho.encode(),
+            'query_string': parametros.encode(),
+            'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookies.encode())],
+            'client': ('127.0.0.1', 0),
+            'server': ('testserver', 80),
+        }
+        corpo_lido = False
+        status = None
+
+        async def receber():
+            nonlocal corpo_lido
+            if corpo_lido:
+                # Depois do corpo o handler só espera a desconexão, que não vem
+                await asyncio.Future()
+            corpo_lido = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem['type'] == 'http.response.start':
+                status = mensagem['status']
+
+        await self.handler(escopo, receber, enviar)
+        return RespostaAsgi(status)
+
+
+def _sessoes_do_banco():
+    """Conexões já abertas no banco desde o início das estatísticas (PostgreSQL 14+)"""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT sessions FROM pg_stat_database WHERE datname = current_database()')
+        return cursor.fetchone()[0]
+
+
+def medir_cenario(cliente, url, repeticoes, aquecimento):
+    """
+    Latências (ms) e consultas de cada repetição, depois do aquecimento, e as
+    conexões novas abertas por requisição
+    """
+    for _ in range(aquecimento):
+        cliente.get(url)
+
+    sessoes_antes = _sessoes_do_banco()
+    latencias, consultas = [], []
+    for _ in range(repeticoes):
+        with MedicaoConsultas() as medicao:
+            inicio = time.perf_counter()
+            resposta = cliente.get(url)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        if resposta.status_code >= 400:
+            raise RuntimeError(f'{url} respondeu {resposta.status_code}')
+        consultas.append(medicao.total)
+    # A própria leitura das estatísticas também conta como uma sessão quando
+    # a conexão de medição não é persistente
+    sessoes_depois = _sessoes_do_banco()
+
+    return {
+        'url': url,
+        'status': resposta.status_code,
+        'p50_ms': round(percentil(latencias, 50), 3),
+        'p95_ms': round(percentil(latencias, 95), 3),
+        'media_ms': round(statistics.fmean(latencias), 3),
+        'min_ms': round(min(latencias), 3),
+        'max_ms': round(max(latencias), 3),
+        'consultas': max(consultas),
+        'consultas_min': min(consultas),
+        'conexoes_por_requisicao': (
+            None if sessoes_antes is None else round((sessoes_depois - sessoes_antes) / repeticoes, 2)
+        ),
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def medir_desempenho(repeticoes=30, aquecimento=3, cenarios=None, asgi=False, log=print):
+    """
+    Mede os cenários sobre a escola já existente no banco, pelo cliente de
+    testes (WSGI) ou, com asgi=True, pelo ASGIHandler
+    """
+    participantes = participantes_da_escola()
+    clientes = {}
+    resultados = {}
+
+    for nome, papel, rota, argumento in CENARIOS:
+        if cenarios and nome not in cenarios:
+            continue
+        if papel not in clientes:
+            clientes[papel] = Client()
+            clientes[papel].force_login(participantes[papel])
+            if asgi:
+                clientes[papel] = ClienteAsgi(clientes[papel])
+        url = _url(rota, participantes['turma'], argumento)
+        resultados[nome] = medir_cenario(clientes[papel], url, repeticoes, aquecimento)
+        log(
+            f"{nome:<24} p50 {resultados[nome]['p50_ms']:>8.2f} ms  "
+            f"p95 {resultados[nome]['p95_ms']:>8.2f} ms  "
+            f"{resultados[nome]['consultas']:>3} consulta(s)"
+            + (
+                f"  {resultados[nome]['conexoes_por_requisicao']:.2f} conexão(ões) nova(s)"
+                if resultados[nome]['conexoes_por_requisicao'] is not None else ''
+            )
+        )
+
+    return {
+        'commit': _commit_atual(),
+        'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'banco': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'servidor': 'asgi' if asgi else 'wsgi',
+        'repeticoes': repeticoes,
+        'aquecimento': aquecimento,
+        'cenarios': resultados,
+    }
+
+
+def comparar(anterior, atual):
+    """Linhas com a variação de p50/p95 e consultas entre dois resultados"""
+    linhas = []
+    for nome, medida in atual['cenarios'].items():
+        base = anterior.get('cenarios', {}).get(nome)
+        if base is None:
+            continue
+        variacoes = []
+        for chave in ('p50_ms', 'p95_ms'):
+            if base[chave]:
+                variacoes.append(f"{chave[:3]} {(medida[chave] - base[chave]) / base[chave] * 100:+.1f}%")
+        variacoes.append(f"consultas {base['consultas']} -> {medida['consultas']}")
+        linhas.append(f"{nome:<24} " + '  '.join(variacoes))
+    return linhas
+
+
+def _conexao_de_medicao(alias, **ajustes):
+    """Conexão nova do alias, fora de `connections`, com a configuração ajustada"""
+    configuracao = copy.deepcopy(connections.settings[alias])
+    configuracao.update(ajustes)
+    backend = load_backend(configuracao['ENGINE'])
+    return backend.DatabaseWrapper(configuracao, alias=alias)
+
+
+def _ciclos_de_requisicao(conexao, repeticoes):
+    """
+    Latências (ms) de `repeticoes` ciclos como os de uma requisição: o Django
+    chama close_if_unusable_or_obsolete() no início e no fim de cada uma
+    (close_old_connections), e a view executa ao menos uma consulta
+    """
+    latencias = []
+    try:
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            conexao.close_if_unusable_or_obsolete()
+            with conexao.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            conexao.close_if_unusable_or_obsolete()
+            latencias.append((time.perf_counter() - inicio) * 1000)
+    finally:
+        conexao.close()
+        if conexao.settings_dict['OPTIONS'].get('pool'):
+            conexao.close_pool()
+    return latencias
+
+
+def medir_conexoes(repeticoes=200, alias='default', log=print):
+    """
+    Custo da conexão por requisição: sem persistência (uma conexão nova por
+    requisição), com conexão persistente e, se configurado, com o pool.
+
+    Os ciclos rodam todos na mesma thread, como sob WSGI. Sob ASGI cada
+    requisição tem thread própria e a conexão persistente não é reaproveitada:
+    ali só valem os modos sem persistência e pool, e o custo real por tela
+    aparece em medir_desempenho(asgi=True).
+    """
+    configurada = connections.settings[alias]
+    opcoes_sem_pool = {chave: valor for chave, valor in configurada['OPTIONS'].items() if chave != 'pool'}
+    modos = {
+        'sem_persistencia': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'OPTIONS': opcoes_sem_pool},
+        'persistente': {
+            'CONN_MAX_AGE': configurada['CONN_MAX_AGE'] or 60,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': opcoes_sem_pool,
+        },
+    }
+    if configurada['OPTIONS'].get('pool'):
+        modos['pool'] = {'CONN_MAX_AGE': 0, 'OPTIONS': configurada['OPTIONS']}
+
+    resultados = {}
+    for modo, ajustes in modos.items():
+        latencias = _ciclos_de_requisicao(_conexao_de_medicao(alias, **ajustes), repeticoes)
+        resultados[modo] = {
+            'p50_ms': round(percentil(latencias, 50), 3),
+            'p95_ms': round(percentil(latencias, 95), 3),
+            'media_ms': round(statistics.fmean(latencias), 3),
+        }
+        log(f"{modo:<18} p50 {resultados[modo]['p50_ms']:>8.3f} ms  p95 {resultados[modo]['p95_ms']:>8.3f} ms")
+
+    return {
+        'commit': _commit_atual(),
+        'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'banco': connection.vendor,
+        'repeticoes': repeticoes,
+        'configuracao': {
+            'CONN_MAX_AGE': configurada['CONN_MAX_AGE'],
+            'CONN_HEALTH_CHECKS': configurada['CONN_HEALTH_CHECKS'],
+            'pool': bool(configurada['OPTIONS'].get('pool')),
+        },
+        'modos': resultados,
+    }
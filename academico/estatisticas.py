@@ -0,0 +1,84 @@
+"""
+Contadores gerais da escola exibidos nos dashboards, guardados em cache.
+
+O retrato fica em cache por bastante tempo, mas só é considerado atual
+enquanto a marca de validade existir (VALIDADE_SEGUNDOS, ou até uma alteração
+invalidá-la). Quando vence, apenas a requisição que obtém a trava recalcula;
+as demais continuam servindo o retrato anterior em vez de repetir as contagens.
+
+Trava, validade e retrato ficam no cache padrão, então só são compartilhados
+entre processos com um cache compartilhado (REDIS_URL, ver settings.CACHES);
+com o cache local cada processo mantém o seu retrato.
+"""
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from pessoas.models import Papel
+from .models import Disciplina, Turma
+
+CHAVE = 'estatisticas_escola'
+CHAVE_VALIDA = 'estatisticas_escola:valida'
+CHAVE_TRAVA = 'estatisticas_escola:trava'
+
+VALIDADE_SEGUNDOS = 60
+RETENCAO_SEGUNDOS = 60 * 60
+TRAVA_SEGUNDOS = 30
+# Quanto uma requisição espera pelo recálculo alheio quando não há retrato algum
+ESPERA_MAXIMA_SEGUNDOS = 2
+INTERVALO_ESPERA = 0.05
+
+
+def _calcular():
+    """Todas as contagens em três consultas"""
+    pessoas = Papel.objects.filter(ativo=True).aggregate(
+        total_alunos=Count('aluno_info'),
+        total_professores=Count('professor_info'),
+    )
+    turmas = Turma.objects.filter(ativa=True).aggregate(
+        total_turmas=Count('pk'),
+        turmas_sem_professor=Count('pk', filter=Q(professor__isnull=True)),
+    )
+    return {
+        **pessoas,
+        **turmas,
+        'total_disciplinas': Disciplina.objects.filter(ativa=True).count(),
+    }
+
+
+def _recalcular():
+    estatisticas = _calcular()
+    cache.set(CHAVE, estatisticas, RETENCAO_SEGUNDOS)
+    cache.set(CHAVE_VALIDA, True, VALIDADE_SEGUNDOS)
+    return estatisticas
+
+
+def obter_estatisticas():
+    """Retrato atual dos contadores, recalculado por uma única requisição por vez"""
+    estatisticas = cache.get(CHAVE)
+    if estatisticas is not None and cache.get(CHAVE_VALIDA):
+        return estatisticas
+
+    if cache.add(CHAVE_TRAVA, True, TRAVA_SEGUNDOS):
+        try:
+            return _recalcular()
+        finally:
+            cache.delete(CHAVE_TRAVA)
+
+    # Outra requisição já está recalculando: serve o retrato vencido, se houver
+    if estatisticas is not None:
+        return estatisticas
+
+    limite = time.monotonic() + ESPERA_MAXIMA_SEGUNDOS
+    while time.monotonic() < limite:
+        time.sleep(INTERVALO_ESPERA)
+        estatisticas = cache.get(CHAVE)
+        if estatisticas is not None:
+            return estatisticas
+    return _calcular()
+
+
+def invalidar_estatisticas():
+    """Marca o retrato como vencido; o próximo acesso dispara o recálculo"""
+    cache.delete(CHAVE_VALIDA)
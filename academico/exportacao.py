@@ -0,0 +1,92 @@
+"""
+Exportação das notas em CSV, uma linha por aluno e turma e uma coluna por
+disciplina e bimestre.
+
+As notas são lidas em ordem por um cursor do lado do servidor (iterator()) e
+cada aluno vira uma linha assim que suas notas terminam, então a memória usada
+não depende do tamanho do recorte e o download começa de imediato. O arquivo
+sai em UTF-8 com BOM, separado por ';' e com vírgula decimal, como o Excel em
+português espera.
+"""
+import csv
+from itertools import groupby, islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from .models import Disciplina, Nota
+
+TAMANHO_BLOCO = 2000
+LINHAS_POR_ENVIO = 500
+
+
+class _Eco:
+    """Arquivo falso para o csv.writer: devolve a linha em vez de gravá-la"""
+
+    def write(self, valor):
+        return valor
+
+
+def _formatar(nota):
+    return '' if nota is None else f'{nota:.2f}'.replace('.', ',')
+
+
+def colunas_notas(disciplina=None, bimestre=None):
+    """Pares (código da disciplina, bimestre) exportados, na ordem das colunas"""
+    disciplinas = [codigo for codigo, _ in Disciplina.DISCIPLINA_CHOICES if disciplina in (None, codigo)]
+    bimestres = [numero for numero, _ in Nota.BIMESTRE_CHOICES if bimestre in (None, numero)]
+    return [(codigo, numero) for codigo in disciplinas for numero in bimestres]
+
+
+def notas_do_recorte(turma=None, ano_letivo=None, disciplina=None, bimestre=None):
+    notas = Nota.objects.all()
+    if turma is not None:
+        notas = notas.filter(turma=turma)
+    if ano_letivo is not None:
+        notas = notas.filter(turma__ano_letivo=ano_letivo)
+    if disciplina is not None:
+        notas = notas.filter(disciplina__nome=disciplina)
+    if bimestre is not None:
+        notas = notas.filter(bimestre=bimestre)
+    return notas.order_by('turma__nome', 'turma_id', 'aluno__papel__pessoa__nome', 'aluno_id').values_list(
+        'turma_id', 'aluno_id', 'turma__nome', 'aluno__matricula', 'aluno__papel__pessoa__nome',
+        'disciplina__nome', 'bimestre', 'nota',
+    )
+
+
+def linhas_csv(turma=None, ano_letivo=None, disciplina=None, bimestre=None):
+    """Gera o CSV linha a linha; alunos sem nenhuma nota no recorte não aparecem"""
+    colunas = colunas_notas(disciplina, bimestre)
+    posicoes = {coluna: indice for indice, coluna in enumerate(colunas)}
+    nomes = dict(Disciplina.DISCIPLINA_CHOICES)
+    escritor = csv.writer(_Eco(), delimiter=';')
+
+    yield '\ufeff' + escritor.writerow(
+        ['Turma', 'Matrícula', 'Aluno'] + [f'{nomes[codigo]} - {numero}º bim.' for codigo, numero in colunas]
+    )
+
+    notas = notas_do_recorte(turma, ano_letivo, disciplina, bimestre).iterator(chunk_size=TAMANHO_BLOCO)
+    for _, linhas in groupby(notas, key=lambda linha: (linha[0], linha[1])):
+        valores = [None] * len(colunas)
+        for _, _, nome_turma, matricula, nome_aluno, codigo, numero, nota in linhas:
+            valores[posicoes[(codigo, numero)]] = nota
+        yield escritor.writerow([nome_turma, matricula, nome_aluno] + [_formatar(valor) for valor in valores])
+
+
+async def _em_envios(linhas):
+    """
+    Sob ASGI o Django só transmite aos poucos iteradores assíncronos: os
+    síncronos seriam lidos inteiros para a memória antes do envio. O cursor
+    continua sendo lido na thread da requisição, em blocos de linhas.
+    """
+    ler_bloco = sync_to_async(lambda: ''.join(islice(linhas, LINHAS_POR_ENVIO)))
+    while bloco := await ler_bloco():
+        yield bloco
+
+
+def resposta_csv(request, linhas, nome_arquivo):
+    conteudo = _em_envios(linhas) if isinstance(request, ASGIRequest) else linhas
+    resposta = StreamingHttpResponse(conteudo, content_type='text/csv; charset=utf-8')
+    resposta['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
+    return resposta
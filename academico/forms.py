@@ -1,17 +1,17 @@
 from django import forms
-from .models import Turma, Disciplina
-from pessoas.models import AlunoInfo, ProfessorInfo
+from .models import Turma, Disciplina, Nota
+from pessoas.models import AlunoInfo, ProfessorInfo, SequenciaMatricula
 
 class TurmaForm(forms.ModelForm):
     professor = forms.ModelChoiceField(
-        queryset=ProfessorInfo.objects.filter(papel__ativo=True),
+        queryset=ProfessorInfo.objects.filter(papel__ativo=True).select_related('papel__pessoa'),
         required=False,
         label='Professor Responsável',
         widget=forms.Select(attrs={'class': 'form-control'})
     )
 
     disciplinas = forms.ModelMultipleChoiceField(
-        queryset=Disciplina.objects.filter(ativa=True),
+        queryset=Disciplina.objects.filter(ativa=True).select_related('professor__papel__pessoa'),
         widget=forms.SelectMultiple(attrs={
             'class': 'form-control select2-multiple',
             'data-placeholder': 'Selecione as disciplinas...'
@@ -45,9 +45,65 @@ class DisciplinaForm(forms.ModelForm):
             'carga_horaria': forms.NumberInput(attrs={'class': 'form-control'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # O rótulo de cada professor usa o nome da pessoa
+        self.fields['professor'].queryset = ProfessorInfo.objects.select_related('papel__pessoa')
+
 class AlunoEditForm(forms.Form):
     matricula = forms.CharField(
         max_length=20,
         label='Matrícula',
         widget=forms.TextInput(attrs={'class': 'form-control'})
-    )
\ No newline at end of file
+    )
+
+    def __init__(self, *args, aluno=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.aluno = aluno
+
+    def clean_matricula(self):
+        matricula = self.cleaned_data['matricula'].strip()
+        if self.aluno is not None and matricula == self.aluno.matricula:
+            return matricula
+        if AlunoInfo.objects.filter(matricula=matricula).exclude(pk=getattr(self.aluno, 'pk', None)).exists():
+            raise forms.ValidationError('Matrícula já usada por outro aluno.')
+        if SequenciaMatricula.ainda_nao_emitida(matricula):
+            raise forms.ValidationError(
+                'Este número ainda será gerado pela numeração automática; use um número já emitido ou outro formato.'
+            )
+        return matricula
+
+class ExportarNotasForm(forms.Form):
+    turma = forms.ModelChoiceField(
+        queryset=Turma.objects.all(),
+        required=False,
+        label='Turma',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    ano_letivo = forms.IntegerField(
+        required=False,
+        label='Ano letivo',
+        help_text='Todas as turmas do ano (quando nenhuma turma é escolhida)',
+        widget=forms.NumberInput(attrs={'class': 'form-control'})
+    )
+    disciplina = forms.ChoiceField(
+        choices=[('', 'Todas')] + list(Disciplina.DISCIPLINA_CHOICES),
+        required=False,
+        label='Disciplina',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    bimestre = forms.TypedChoiceField(
+        choices=[('', 'Todos')] + list(Nota.BIMESTRE_CHOICES),
+        coerce=int,
+        empty_value=None,
+        required=False,
+        label='Bimestre',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    def clean(self):
+        dados = super().clean()
+        if not dados.get('turma') and not dados.get('ano_letivo'):
+            raise forms.ValidationError('Escolha uma turma ou informe o ano letivo.')
+        dados['disciplina'] = dados.get('disciplina') or None
+        return dados
@@ -0,0 +1,303 @@
+"""
+Gerador de uma escola completa (pessoas, turmas, matrículas, chamadas e notas)
+para bancos de homologação e benchmark. Usa uma semente fixa, então a mesma
+configuração sempre produz os mesmos dados, e grava tudo com INSERTs em lote.
+"""
+import random
+import unicodedata
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from faker import Faker
+
+from contas.senhas import gerar_hashes
+from pessoas.models import Pessoa, Papel, AlunoInfo, ProfessorInfo, SequenciaMatricula
+from .models import Chamada, Disciplina, Matricula, Nota, Turma
+from .estatisticas import invalidar_estatisticas
+from .services import reconstruir_boletins, reconstruir_frequencias, recontar_alunos
+
+SENHAS = {
+    Papel.ALUNO: 'aluno',
+    Papel.PROFESSOR: 'professor',
+    Papel.COORDENADOR: 'coordenador',
+}
+
+# Idade típica de cada série no início do ano letivo
+IDADE_POR_SERIE = {serie: indice + 6 for indice, (serie, _) in enumerate(Turma.SERIE_CHOICES)}
+
+TAMANHO_LOTE = 5000
+
+
+def remove_acentos(txt):
+    return ''.join(
+        c for c in unicodedata.normalize('NFKD', txt)
+        if not unicodedata.combining(c)
+    )
+
+
+def _inserir_em_lotes(modelo, objetos, tamanho=TAMANHO_LOTE):
+    """Consome um iterável de instâncias gravando-as em lotes de bulk_create"""
+    objetos = iter(objetos)
+    total = 0
+    while lote := list(islice(objetos, tamanho)):
+        modelo.objects.bulk_create(lote)
+        total += len(lote)
+    return total
+
+
+def _dias_letivos(ano, quantidade):
+    """Dias úteis a partir de 1º de fevereiro do ano letivo"""
+    dias = []
+    dia = date(ano, 2, 1)
+    while len(dias) < quantidade and dia.year == ano:
+        if dia.weekday() < 5:
+            dias.append(dia)
+        dia += timedelta(days=1)
+    return dias
+
+
+class GeradorEscola:
+    """Monta a escola em memória e grava cada tabela com INSERTs em lote"""
+
+    def __init__(self, alunos=1000, turmas=30, professores=24, dias=200, ano=None,
+                 semente=42, processos=4, log=print):
+        self.total_alunos = alunos
+        self.total_turmas = turmas
+        self.total_professores = max(professores, 1)
+        self.total_dias = dias
+        self.ano = ano or date.today().year
+        self.processos = processos
+        self.log = log
+
+        self.random = random.Random(semente)
+        self.fake = Faker('pt_BR')
+        self.fake.seed_instance(semente)
+
+        self.usernames = set(User.objects.values_list('username', flat=True))
+        self.cpfs = set(Pessoa.objects.values_list('cpf', flat=True))
+
+    # ---- Pessoas ----
+
+    def _username(self, nome):
+        partes = remove_acentos(nome).lower().split()
+        base = f"{partes[0]}.{partes[-1]}"[:140]
+        username, sufixo = base, 1
+        while username in self.usernames:
+            sufixo += 1
+            username = f"{base}{sufixo}"
+        self.usernames.add(username)
+        return username
+
+    def _cpf(self):
+        cpf = self.fake.cpf()
+        while cpf in self.cpfs:
+            cpf = self.fake.cpf()
+        self.cpfs.add(cpf)
+        return cpf
+
+    def _criar_pessoas(self, tipo, nascimentos):
+        """Cria User, Pessoa e Papel para cada data de nascimento informada"""
+        dados = []
+        for nascimento in nascimentos:
+            nome = self.fake.name()[:100]
+            dados.append({
+                'nome': nome,
+                'username': self._username(nome),
+                'cpf': self._cpf(),
+                'data_nascimento': nascimento,
+                'email': self.fake.email()[:254],
+                'telefone': self.fake.phone_number()[:15],
+            })
+
+        self.log(f"Gerando {len(dados)} hash(es) de senha ({tipo.lower()})...")
+        hashes = gerar_hashes([SENHAS[tipo]] * len(dados), self.processos)
+
+        users = User.objects.bulk_create(
+            [User(username=item['username'], password=senha) for item, senha in zip(dados, hashes)],
+            batch_size=TAMANHO_LOTE
+        )
+        pessoas = Pessoa.objects.bulk_create(
+            [
+                Pessoa(
+                    user=user,
+                    nome=item['nome'],
+                    cpf=item['cpf'],
+                    data_nascimento=item['data_nascimento'],
+                    email=item['email'],
+                    telefone=item['telefone'],
+                )
+                for user, item in zip(users, dados)
+            ],
+            batch_size=TAMANHO_LOTE
+        )
+        return Papel.objects.bulk_create(
+            [Papel(pessoa=pessoa, tipo=tipo) for pessoa in pessoas],
+            batch_size=TAMANHO_LOTE
+        )
+
+    def _nascimento(self, idade):
+        inicio = date(self.ano - idade - 1, 4, 1)
+        return inicio + timedelta(days=self.random.randrange(365))
+
+    # ---- Estrutura acadêmica ----
+
+    def _criar_professores(self):
+        papeis = self._criar_pessoas(
+            Papel.PROFESSOR,
+            [self._nascimento(self.random.randint(25, 60)) for _ in range(self.total_professores)]
+        )
+        return ProfessorInfo.objects.bulk_create([
+            ProfessorInfo(
+                papel=papel,
+                codigo_funcional=f"{self.ano}P{indice:05d}",
+                formacao=self.fake.job()[:100],
+            )
+            for indice, papel in enumerate(papeis, start=1)
+        ])
+
+    def _criar_disciplinas(self, professores):
+        """Cada professor assume uma disciplina; cada matéria tem ao menos uma"""
+        codigos = [codigo for codigo, _ in Disciplina.DISCIPLINA_CHOICES]
+        disciplinas = Disciplina.objects.bulk_create([
+            Disciplina(nome=codigos[indice % len(codigos)], professor=professor)
+            for indice, professor in enumerate(professores)
+        ])
+        por_materia = {}
+        for disciplina in disciplinas:
+            por_materia.setdefault(disciplina.nome, []).append(disciplina)
+        return por_materia
+
+    def _turmas_planejadas(self):
+        """(nome, série, período) de cada turma: 1º A, 2º A, ..., 9º A, 1º B, ..."""
+        series = [serie for serie, _ in Turma.SERIE_CHOICES]
+        periodos = ['MATUTINO', 'VESPERTINO']
+        for indice in range(self.total_turmas):
+            serie = series[indice % len(series)]
+            letra = indice // len(series)
+            nome = f"{serie[0]}º {chr(ord('A') + letra % 26)}{letra // 26 or ''}"
+            yield nome, serie, periodos[letra % len(periodos)]
+
+    def _criar_turmas(self, professores, disciplinas_por_materia):
+        turmas = Turma.objects.bulk_create([
+            Turma(
+                nome=nome,
+                serie=serie,
+                periodo=periodo,
+                ano_letivo=self.ano,
+                professor=professores[indice % len(professores)],
+            )
+            for indice, (nome, serie, periodo) in enumerate(self._turmas_planejadas())
+        ])
+
+        vinculos = []
+        for indice, turma in enumerate(turmas):
+            for disciplinas in disciplinas_por_materia.values():
+                disciplina = disciplinas[indice % len(disciplinas)]
+                vinculos.append(Turma.disciplinas.through(turma_id=turma.id, disciplina_id=disciplina.id))
+        Turma.disciplinas.through.objects.bulk_create(vinculos)
+        return turmas
+
+    def _criar_alunos(self, turmas, matriculas):
+        """Distribui os alunos entre as turmas, com idade compatível com a série"""
+        distribuicao = [turmas[indice % len(turmas)] for indice in range(self.total_alunos)]
+        papeis = self._criar_pessoas(
+            Papel.ALUNO,
+            [self._nascimento(IDADE_POR_SERIE[turma.serie]) for turma in distribuicao]
+        )
+        alunos = AlunoInfo.objects.bulk_create(
+            [AlunoInfo(papel=papel, matricula=matricula) for papel, matricula in zip(papeis, matriculas)],
+            batch_size=TAMANHO_LOTE
+        )
+        Matricula.objects.bulk_create(
+            [
+                Matricula(aluno=aluno, turma=turma, data_matricula=date(self.ano, 2, 1))
+                for aluno, turma in zip(alunos, distribuicao)
+            ],
+            batch_size=TAMANHO_LOTE
+        )
+        recontar_alunos([turma.id for turma in turmas])
+
+        alunos_por_turma = {}
+        for aluno, turma in zip(alunos, distribuicao):
+            alunos_por_turma.setdefault(turma.id, []).append(aluno.id)
+        return alunos_por_turma
+
+    # ---- Chamadas e notas ----
+
+    def _chamadas(self, alunos_por_turma, dias):
+        for turma_id, alunos_ids in alunos_por_turma.items():
+            for dia in dias:
+                for aluno_id in alunos_ids:
+                    yield Chamada(
+                        turma_id=turma_id,
+                        aluno_id=aluno_id,
+                        data=dia,
+                        presente=self.random.random() < 0.92,
+                    )
+
+    def _notas(self, alunos_por_turma, bimestres):
+        disciplinas_por_turma = {}
+        for turma_id, disciplina_id in Turma.disciplinas.through.objects.filter(
+            turma_id__in=alunos_por_turma
+        ).values_list('turma_id', 'disciplina_id'):
+            disciplinas_por_turma.setdefault(turma_id, []).append(disciplina_id)
+
+        for turma_id, alunos_ids in alunos_por_turma.items():
+            for aluno_id in alunos_ids:
+                for disciplina_id in disciplinas_por_turma.get(turma_id, []):
+                    for bimestre in range(1, bimestres + 1):
+                        valor = min(max(self.random.gauss(7, 1.8), 0), 10)
+                        yield Nota(
+                            aluno_id=aluno_id,
+                            disciplina_id=disciplina_id,
+                            turma_id=turma_id,
+                            bimestre=bimestre,
+                            nota=Decimal(f"{valor:.1f}"),
+                        )
+
+    def gerar(self):
+        nomes = [nome for nome, _, _ in self._turmas_planejadas()]
+        if Turma.objects.filter(ano_letivo=self.ano, nome__in=nomes).exists():
+            raise ValueError(f"Já existem turmas geradas para {self.ano}; use outro ano letivo.")
+
+        # Reservadas antes da transação: o contador do ano não fica travado
+        # (bloqueando os cadastros de alunos) enquanto a escola é gerada
+        matriculas = SequenciaMatricula.proximas_matriculas(self.total_alunos, self.ano)
+
+        with transaction.atomic():
+            self._criar_pessoas(Papel.COORDENADOR, [self._nascimento(45)])
+            professores = self._criar_professores()
+            disciplinas_por_materia = self._criar_disciplinas(professores)
+            turmas = self._criar_turmas(professores, disciplinas_por_materia)
+            self.log(f"{len(turmas)} turma(s) criadas.")
+            alunos_por_turma = self._criar_alunos(turmas, matriculas)
+
+            dias = _dias_letivos(self.ano, self.total_dias)
+            total_chamadas = _inserir_em_lotes(Chamada, self._chamadas(alunos_por_turma, dias))
+            self.log(f"{total_chamadas} chamada(s) criadas.")
+
+            # Bimestres já encerrados, proporcional aos dias letivos gerados
+            bimestres = min(4, max(1, round(4 * len(dias) / 200)))
+            total_notas = _inserir_em_lotes(Nota, self._notas(alunos_por_turma, bimestres))
+            self.log(f"{total_notas} nota(s) criadas.")
+
+            turmas_geradas = Turma.objects.filter(pk__in=[turma.pk for turma in turmas])
+            reconstruir_frequencias(turmas_geradas)
+            reconstruir_boletins(turmas_geradas)
+            transaction.on_commit(invalidar_estatisticas)
+
+        return {
+            'alunos': self.total_alunos,
+            'professores': len(professores),
+            'turmas': len(turmas),
+            'chamadas': total_chamadas,
+            'notas': total_notas,
+        }
+
+
+def gerar_escola(**opcoes):
+    """Atalho para GeradorEscola(**opcoes).gerar()"""
+    return GeradorEscola(**opcoes).gerar()
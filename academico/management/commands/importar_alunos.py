@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from academico.models import Turma
+from contas.importacao import ArquivoInvalido, importar_alunos
+
+
+class Command(BaseCommand):
+    help = 'Importa alunos de um CSV, com os hashes de senha calculados em paralelo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='CSV com as colunas da tela de importação')
+        parser.add_argument('--turma', type=int, help='ID da turma usada nas linhas sem a coluna turma')
+        parser.add_argument('--processos', type=int, default=4, help='Processos para calcular os hashes de senha')
+
+    def handle(self, *args, **options):
+        turma = None
+        if options['turma']:
+            turma = Turma.objects.filter(pk=options['turma'], ativa=True).first()
+            if turma is None:
+                raise CommandError(f"Turma {options['turma']} não encontrada ou inativa.")
+
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                relatorio = importar_alunos(
+                    arquivo, turma, processos=options['processos'], log=self.stdout.write
+                )
+        except OSError as erro:
+            raise CommandError(f"Não foi possível ler {options['arquivo']}: {erro}")
+        except ArquivoInvalido as erro:
+            raise CommandError(str(erro))
+
+        for erro in relatorio['erros']:
+            self.stdout.write(self.style.WARNING(f"Linha {erro['linha']}: {'; '.join(erro['erros'])}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"{relatorio['criados']} aluno(s) importado(s), {relatorio['matriculados']} matriculado(s) em turma."
+        ))
@@ -0,0 +1,33 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from academico.desempenho import medir_conexoes
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o custo da conexão com o banco por requisição: conexão nova a cada '
+        'requisição, conexão persistente (só WSGI) e pool (se DB_POOL=1)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=200, help='Requisições simuladas por modo')
+        parser.add_argument('--database', default='default', help='Alias do banco medido')
+        parser.add_argument('--saida', help='Arquivo JSON com o resultado')
+
+    def handle(self, *args, **options):
+        if options['repeticoes'] < 1:
+            raise CommandError('--repeticoes deve ser ao menos 1.')
+
+        resultado = medir_conexoes(
+            repeticoes=options['repeticoes'],
+            alias=options['database'],
+            log=self.stdout.write,
+        )
+
+        if options['saida']:
+            saida = Path(options['saida'])
+            saida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f'Resultado salvo em {saida}'))
@@ -0,0 +1,93 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from academico.desempenho import CENARIOS, comparar, medir_desempenho
+from academico.gerador import gerar_escola
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera uma escola num banco de teste descartável e mede p50/p95 e consultas '
+        'das telas principais de coordenador, professor e aluno'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alunos', type=int, default=1000)
+        parser.add_argument('--turmas', type=int, default=30)
+        parser.add_argument('--professores', type=int, default=24)
+        parser.add_argument('--dias', type=int, default=60, help='Dias letivos com chamada')
+        parser.add_argument('--semente', type=int, default=42, help='Semente dos dados gerados')
+        parser.add_argument('--processos', type=int, default=4, help='Processos para calcular os hashes de senha')
+        parser.add_argument('--repeticoes', type=int, default=30, help='Requisições medidas por tela')
+        parser.add_argument('--aquecimento', type=int, default=3, help='Requisições descartadas antes de medir')
+        parser.add_argument(
+            '--cenario', action='append', dest='cenarios', choices=[nome for nome, *_ in CENARIOS],
+            help='Mede apenas este cenário (pode repetir)',
+        )
+        parser.add_argument('--saida', help='Arquivo JSON com o resultado (padrão: desempenho-<commit>.json)')
+        parser.add_argument('--comparar', help='JSON de uma medição anterior para exibir a variação')
+        parser.add_argument(
+            '--banco-atual', action='store_true',
+            help='Mede a escola já existente no banco configurado, sem gerar dados',
+        )
+        parser.add_argument(
+            '--asgi', action='store_true',
+            help=(
+                'Envia as requisições pelo ASGIHandler, como o uvicorn; rode com POA_ASGI=1 '
+                'para usar a configuração de conexões do deploy'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options['repeticoes'] < 1:
+            raise CommandError('--repeticoes deve ser ao menos 1.')
+
+        anterior = None
+        if options['comparar']:
+            try:
+                anterior = json.loads(Path(options['comparar']).read_text(encoding='utf-8'))
+            except (OSError, ValueError) as erro:
+                raise CommandError(f"Não foi possível ler {options['comparar']}: {erro}")
+
+        setup_test_environment()
+        bancos = None
+        try:
+            escola = None
+            if not options['banco_atual']:
+                self.stdout.write('Criando banco de teste...')
+                bancos = setup_databases(verbosity=0, interactive=False)
+                escola = gerar_escola(
+                    alunos=options['alunos'],
+                    turmas=options['turmas'],
+                    professores=options['professores'],
+                    dias=options['dias'],
+                    semente=options['semente'],
+                    processos=options['processos'],
+                    log=self.stdout.write,
+                )
+            resultado = medir_desempenho(
+                repeticoes=options['repeticoes'],
+                aquecimento=options['aquecimento'],
+                cenarios=options['cenarios'],
+                asgi=options['asgi'],
+                log=self.stdout.write,
+            )
+        except ValueError as erro:
+            raise CommandError(str(erro))
+        finally:
+            if bancos is not None:
+                teardown_databases(bancos, verbosity=0)
+            teardown_test_environment()
+
+        resultado['escola'] = escola
+        saida = Path(options['saida'] or f"desempenho-{resultado['commit'] or 'local'}.json")
+        saida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f'Resultado salvo em {saida}'))
+
+        if anterior is not None:
+            self.stdout.write(f"Variação em relação a {anterior.get('commit') or options['comparar']}:")
+            for linha in comparar(anterior, resultado):
+                self.stdout.write(linha)
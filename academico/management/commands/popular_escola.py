@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from academico.gerador import gerar_escola
+
+
+class Command(BaseCommand):
+    help = 'Gera uma escola completa (pessoas, turmas, chamadas e notas) com dados fictícios determinísticos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alunos', type=int, default=1000)
+        parser.add_argument('--turmas', type=int, default=30)
+        parser.add_argument('--professores', type=int, default=24)
+        parser.add_argument('--dias', type=int, default=200, help='Dias letivos com chamada')
+        parser.add_argument('--ano', type=int, help='Ano letivo (padrão: ano atual)')
+        parser.add_argument('--semente', type=int, default=42, help='Semente dos dados gerados')
+        parser.add_argument('--processos', type=int, default=4, help='Processos para calcular os hashes de senha')
+
+    def handle(self, *args, **options):
+        try:
+            resumo = gerar_escola(
+                alunos=options['alunos'],
+                turmas=options['turmas'],
+                professores=options['professores'],
+                dias=options['dias'],
+                ano=options['ano'],
+                semente=options['semente'],
+                processos=options['processos'],
+                log=self.stdout.write,
+            )
+        except ValueError as erro:
+            raise CommandError(str(erro))
+
+        self.stdout.write(self.style.SUCCESS(
+            'Escola gerada: ' + ', '.join(f'{total} {nome}' for nome, total in resumo.items())
+        ))
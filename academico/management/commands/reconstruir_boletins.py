@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from academico.models import Turma
+from academico.services import reconstruir_boletins
+
+
+class Command(BaseCommand):
+    help = 'Recalcula a tabela de boletins a partir das notas lançadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turma', type=int, action='append', help='ID da turma (pode ser repetido)')
+
+    def handle(self, *args, **options):
+        turmas = Turma.objects.filter(pk__in=options['turma']) if options['turma'] else None
+        total = reconstruir_boletins(turmas)
+        self.stdout.write(self.style.SUCCESS(f'{total} linha(s) de boletim recalculada(s).'))
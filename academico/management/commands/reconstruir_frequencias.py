@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from academico.models import Turma
+from academico.services import reconstruir_frequencias
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o consolidado mensal de frequência a partir das chamadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turma', type=int, action='append', help='ID da turma (pode ser repetido)')
+        parser.add_argument('--lote', type=int, default=50, help='Quantidade de turmas processadas por transação')
+
+    def handle(self, *args, **options):
+        turmas = Turma.objects.filter(pk__in=options['turma']) if options['turma'] else None
+        total = reconstruir_frequencias(turmas, tamanho_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'{total} linha(s) de frequência recalculada(s).'))
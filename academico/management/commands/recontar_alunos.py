@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from academico.services import recontar_alunos
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o total de alunos com matrícula ativa de cada turma'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turma', type=int, action='append', help='ID da turma (pode ser repetido)')
+
+    def handle(self, *args, **options):
+        total = recontar_alunos(options['turma'])
+        self.stdout.write(self.style.SUCCESS(f'{total} turma(s) recontada(s).'))
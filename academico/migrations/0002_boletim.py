@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def preencher_boletins(apps, schema_editor):
+    Nota = apps.get_model('academico', 'Nota')
+    Boletim = apps.get_model('academico', 'Boletim')
+
+    linhas = {}
+    for nota in Nota.objects.order_by().iterator():
+        chave = (nota.aluno_id, nota.turma_id, nota.disciplina_id)
+        linha = linhas.setdefault(chave, Boletim(
+            aluno_id=nota.aluno_id, turma_id=nota.turma_id, disciplina_id=nota.disciplina_id
+        ))
+        setattr(linha, f'nota_{nota.bimestre}', nota.nota)
+
+    for linha in linhas.values():
+        notas = [n for n in (linha.nota_1, linha.nota_2, linha.nota_3, linha.nota_4) if n is not None]
+        linha.media = round(sum(notas) / len(notas), 2)
+    Boletim.objects.bulk_create(linhas.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academico', '0001_initial'),
+        ('pessoas', '0002_alter_alunoinfo_matricula'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Boletim',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nota_1', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True, verbose_name='1º Bimestre')),
+                ('nota_2', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True, verbose_name='2º Bimestre')),
+                ('nota_3', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True, verbose_name='3º Bimestre')),
+                ('nota_4', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True, verbose_name='4º Bimestre')),
+                ('media', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True, verbose_name='Média')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='boletins', to='pessoas.alunoinfo', verbose_name='Aluno')),
+                ('disciplina', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='boletins', to='academico.disciplina', verbose_name='Disciplina')),
+                ('turma', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='boletins', to='academico.turma', verbose_name='Turma')),
+            ],
+            options={
+                'verbose_name': 'Boletim',
+                'verbose_name_plural': 'Boletins',
+                'ordering': ['turma', 'disciplina'],
+                'unique_together': {('aluno', 'turma', 'disciplina')},
+            },
+        ),
+        migrations.RunPython(preencher_boletins, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:58
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def contar_alunos(apps, schema_editor):
+    Turma = apps.get_model('academico', 'Turma')
+    Matricula = apps.get_model('academico', 'Matricula')
+    ativas = Matricula.objects.filter(
+        turma=OuterRef('pk'),
+        ativa=True
+    ).order_by().values('turma').annotate(total=Count('pk')).values('total')
+    Turma.objects.update(total_alunos=Coalesce(Subquery(ativas), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academico', '0002_boletim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turma',
+            name='total_alunos',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Total de alunos'),
+        ),
+        migrations.RunPython(contar_alunos, migrations.RunPython.noop),
+    ]
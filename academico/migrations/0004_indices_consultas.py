@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academico', '0003_turma_total_alunos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chamada',
+            index=models.Index(fields=['turma', 'data'], include=('aluno', 'presente'), name='chamada_turma_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chamada',
+            index=models.Index(fields=['aluno', 'turma', 'data'], include=('presente',), name='chamada_aluno_turma_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disciplina',
+            index=models.Index(condition=models.Q(('ativa', True)), fields=['nome'], name='disciplina_ativa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='matricula',
+            index=models.Index(condition=models.Q(('ativa', True)), fields=['turma'], include=('aluno',), name='matricula_turma_ativa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='matricula',
+            index=models.Index(condition=models.Q(('ativa', True)), fields=['aluno'], include=('turma',), name='matricula_aluno_ativa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nota',
+            index=models.Index(fields=['turma', 'disciplina'], include=('aluno', 'bimestre', 'nota'), name='nota_turma_disciplina_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turma',
+            index=models.Index(condition=models.Q(('ativa', True)), fields=['nome', 'id'], name='turma_ativa_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turma',
+            index=models.Index(condition=models.Q(('ativa', True)), fields=['serie', 'periodo', 'ano_letivo'], name='turma_ativa_serie_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from pessoas.models import ProfessorInfo, AlunoInfo
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -34,6 +35,9 @@ class Disciplina(models.Model):
         verbose_name = 'Disciplina'
         verbose_name_plural = 'Disciplinas'
         ordering = ['nome']
+        indexes = [
+            models.Index(fields=['nome'], condition=models.Q(ativa=True), name='disciplina_ativa_idx'),
+        ]
     
     def __str__(self):
         return self.get_nome_display()
@@ -81,6 +85,8 @@ class Turma(models.Model):
         verbose_name='Disciplinas'
     )
     ativa = models.BooleanField(default=True, verbose_name='Turma ativa')
+    # Quantidade de matrículas ativas, mantida pelas escritas em Matricula
+    total_alunos = models.PositiveIntegerField(default=0, editable=False, verbose_name='Total de alunos')
     data_criacao = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -88,13 +94,18 @@ class Turma(models.Model):
         verbose_name_plural = 'Turmas'
         ordering = ['ano_letivo', 'serie', 'nome']
         unique_together = ['nome', 'ano_letivo']
+        indexes = [
+            # Listagem paginada por (nome, id) e alocação por série/período
+            models.Index(fields=['nome', 'id'], condition=models.Q(ativa=True), name='turma_ativa_nome_idx'),
+            models.Index(
+                fields=['serie', 'periodo', 'ano_letivo'],
+                condition=models.Q(ativa=True),
+                name='turma_ativa_serie_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.nome} - {self.get_serie_display()} ({self.ano_letivo})"
-    
-    @property
-    def total_alunos(self):
-        return self.matriculas.filter(ativa=True).count()
 
 class Matricula(models.Model):
     SITUACAO_CHOICES = [
@@ -130,10 +141,54 @@ class Matricula(models.Model):
         verbose_name_plural = 'Matrículas'
         unique_together = ['aluno', 'turma']
         ordering = ['-data_matricula']
+        indexes = [
+            # Alunos ativos de uma turma (chamada, diário, contagens) e turmas ativas de um aluno
+            models.Index(
+                fields=['turma'], include=['aluno'], condition=models.Q(ativa=True), name='matricula_turma_ativa_idx'
+            ),
+            models.Index(
+                fields=['aluno'], include=['turma'], condition=models.Q(ativa=True), name='matricula_aluno_ativa_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.aluno} - {self.turma}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guarda o estado carregado para ajustar Turma.total_alunos no save().
+        # Com turma ou ativa adiados (.only()/.defer()) o estado fica desconhecido
+        # e é lido do banco no momento de gravar.
+        if 'turma_id' in instance.__dict__ and 'ativa' in instance.__dict__:
+            instance._contagem_original = (instance.turma_id, instance.ativa)
+        else:
+            instance._contagem_original = None
+        return instance
+
+    def contagem_no_banco(self):
+        """(turma_id, ativa) gravados para esta matrícula, com a linha travada até o fim da transação"""
+        return Matricula.objects.select_for_update().filter(pk=self.pk).values_list('turma_id', 'ativa').first()
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if self._state.adding:
+                turma_anterior, ativa_anterior = None, False
+            else:
+                turma_anterior, ativa_anterior = (
+                    getattr(self, '_contagem_original', None) or self.contagem_no_banco() or (None, False)
+                )
+            contava_em = turma_anterior if ativa_anterior else None
+            conta_em = self.turma_id if self.ativa else None
+
+            super().save(*args, **kwargs)
+            if contava_em != conta_em:
+                if contava_em is not None:
+                    Turma.objects.filter(pk=contava_em).update(total_alunos=F('total_alunos') - 1)
+                if conta_em is not None:
+                    Turma.objects.filter(pk=conta_em).update(total_alunos=F('total_alunos') + 1)
+        self._contagem_original = (self.turma_id, self.ativa)
+
 class Chamada(models.Model):
     turma = models.ForeignKey(
         Turma,
@@ -156,11 +211,28 @@ class Chamada(models.Model):
         verbose_name_plural = 'Chamadas'
         unique_together = ['turma', 'aluno', 'data']
         ordering = ['data', 'aluno']
+        indexes = [
+            # Chamada do dia de uma turma e histórico de um aluno na turma
+            models.Index(fields=['turma', 'data'], include=['aluno', 'presente'], name='chamada_turma_data_idx'),
+            models.Index(fields=['aluno', 'turma', 'data'], include=['presente'], name='chamada_aluno_turma_idx'),
+        ]
 
     def __str__(self):
         status = "Presente" if self.presente else "Faltou"
         return f"{self.data} - {self.aluno} - {status}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Situação contada na Frequencia ao ser carregada (None se algum campo foi adiado)
+        situacao = tuple(instance.__dict__.get(campo) for campo in ('turma_id', 'aluno_id', 'data', 'presente'))
+        instance._frequencia_original = None if None in situacao else situacao
+        return instance
+
+    @property
+    def situacao_frequencia(self):
+        return (self.turma_id, self.aluno_id, self.data, self.presente)
+
 
 class Nota(models.Model):
     BIMESTRE_CHOICES = [
@@ -202,10 +274,28 @@ class Nota(models.Model):
         verbose_name_plural = 'Notas'
         unique_together = ['aluno', 'disciplina', 'turma', 'bimestre']
         ordering = ['turma', 'disciplina', 'bimestre', 'aluno']
+        indexes = [
+            # Diário de classe: notas de uma disciplina na turma
+            models.Index(
+                fields=['turma', 'disciplina'], include=['aluno', 'bimestre', 'nota'], name='nota_turma_disciplina_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.aluno} - {self.disciplina} - {self.get_bimestre_display()}: {self.nota}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Linha de Boletim a que a nota pertencia ao ser carregada (None se algum campo foi adiado)
+        chave = tuple(instance.__dict__.get(campo) for campo in ('turma_id', 'aluno_id', 'disciplina_id'))
+        instance._boletim_original = None if None in chave else chave
+        return instance
+
+    @property
+    def chave_boletim(self):
+        return (self.turma_id, self.aluno_id, self.disciplina_id)
+
 class Frequencia(models.Model):
     aluno = models.ForeignKey(
         AlunoInfo,
@@ -241,4 +331,44 @@ class Frequencia(models.Model):
     def percentual_presenca(self):
         if self.total_aulas > 0:
             return (self.total_presencas / self.total_aulas) * 100
-        return 0
\ No newline at end of file
+        return 0
+
+class Boletim(models.Model):
+    """Notas consolidadas por aluno/turma/disciplina, atualizadas a cada lançamento de Nota"""
+    aluno = models.ForeignKey(
+        AlunoInfo,
+        on_delete=models.CASCADE,
+        related_name='boletins',
+        verbose_name='Aluno'
+    )
+    turma = models.ForeignKey(
+        Turma,
+        on_delete=models.CASCADE,
+        related_name='boletins',
+        verbose_name='Turma'
+    )
+    disciplina = models.ForeignKey(
+        Disciplina,
+        on_delete=models.CASCADE,
+        related_name='boletins',
+        verbose_name='Disciplina'
+    )
+    nota_1 = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, verbose_name='1º Bimestre')
+    nota_2 = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, verbose_name='2º Bimestre')
+    nota_3 = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, verbose_name='3º Bimestre')
+    nota_4 = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, verbose_name='4º Bimestre')
+    media = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, verbose_name='Média')
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name='Atualizado em')
+
+    class Meta:
+        verbose_name = 'Boletim'
+        verbose_name_plural = 'Boletins'
+        unique_together = ['aluno', 'turma', 'disciplina']
+        ordering = ['turma', 'disciplina']
+
+    def __str__(self):
+        return f"{self.aluno} - {self.disciplina} - Média: {self.media}"
+
+    @property
+    def notas(self):
+        return [self.nota_1, self.nota_2, self.nota_3, self.nota_4]
@@ -0,0 +1,128 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.db.models import F, IntegerField, Q
+from django.db.models.functions import Cast
+
+TAMANHO_PAGINA = 20
+
+
+def _codificar(valores):
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode().rstrip('=')
+
+
+def _do_tipo(valor, tipo):
+    # bool é subclasse de int, mas nunca é um valor válido de chave
+    return isinstance(valor, tipo) and not isinstance(valor, bool)
+
+
+def _decodificar(cursor, colunas):
+    """
+    Devolve (direção, valores da chave) do cursor ou None se ele for inválido,
+    inclusive quando algum valor não é do tipo da sua coluna (um texto na
+    posição do id faria o filtro falhar no banco)
+    """
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        direcao, valores = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+    except (ValueError, TypeError):
+        return None
+    if (
+        direcao not in ('p', 'a')
+        or not isinstance(valores, list)
+        or len(valores) != len(colunas)
+        or not all(_do_tipo(valor, tipo) for valor, (_, _, tipo) in zip(valores, colunas))
+    ):
+        return None
+    return direcao, valores
+
+
+def _depois_de(colunas, valores, para_frente):
+    """Condição 'chave vem depois (ou antes) de valores' na ordem das colunas"""
+    condicoes = []
+    for indice, (campo, decrescente, _) in enumerate(colunas):
+        operador = 'gt' if para_frente != decrescente else 'lt'
+        iguais = {nome: valor for (nome, _, _), valor in zip(colunas[:indice], valores)}
+        condicoes.append(Q(**iguais, **{f'{campo}__{operador}': valores[indice]}))
+    return reduce(or_, condicoes)
+
+
+class PaginaCursor:
+    """
+    Página de uma listagem paginada por chave (nome, id). Cada página busca
+    apenas tamanho + 1 linhas a partir do cursor, sem COUNT nem OFFSET.
+    """
+
+    def __init__(self, itens, cursor_anterior=None, cursor_proximo=None):
+        self.itens = itens
+        self.cursor_anterior = cursor_anterior
+        self.cursor_proximo = cursor_proximo
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+    def __bool__(self):
+        return bool(self.itens)
+
+    @property
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    @property
+    def has_next(self):
+        return self.cursor_proximo is not None
+
+    def has_other_pages(self):
+        return self.has_previous or self.has_next
+
+
+def paginar_por_cursor(queryset, cursor=None, campo_nome='nome', tamanho=TAMANHO_PAGINA, relevancia=None):
+    """
+    Pagina o queryset pela chave estável (campo_nome, id). O cursor vem da
+    querystring, então os filtros já aplicados ao queryset são preservados.
+
+    Com `relevancia` (expressão numérica, p.ex. a similaridade de uma busca),
+    a chave passa a ser (relevância decrescente, nome, id).
+    """
+    # (coluna, decrescente, tipo dos valores guardados no cursor)
+    tipo_pk = int if isinstance(queryset.model._meta.pk, IntegerField) else str
+    colunas = [('chave_nome', False, str), ('pk', False, tipo_pk)]
+    queryset = queryset.annotate(chave_nome=F(campo_nome))
+    if relevancia is not None:
+        # Inteiro para que o valor guardado no cursor compare exatamente no banco
+        queryset = queryset.annotate(chave_relevancia=Cast(relevancia * 10000, IntegerField()))
+        colunas.insert(0, ('chave_relevancia', True, int))
+
+    posicao = _decodificar(cursor, colunas) if cursor else None
+    direcao = posicao[0] if posicao else 'p'
+    para_frente = direcao == 'p'
+
+    ordem = [('-' if decrescente == para_frente else '') + campo for campo, decrescente, _ in colunas]
+    if posicao:
+        queryset = queryset.filter(_depois_de(colunas, posicao[1], para_frente))
+    linhas = list(queryset.order_by(*ordem)[:tamanho + 1])
+
+    sobrou = len(linhas) > tamanho
+    itens = linhas[:tamanho]
+    if not para_frente:
+        itens.reverse()
+
+    # Indo para frente, só há página anterior se viemos de um cursor; voltando,
+    # a linha extra indica que ainda existem páginas antes desta
+    tem_anterior = posicao is not None if para_frente else sobrou
+    tem_proximo = sobrou if para_frente else True
+
+    def chave(item):
+        return [getattr(item, campo) for campo, _, _ in colunas]
+
+    pagina = PaginaCursor(itens)
+    if itens and tem_anterior:
+        pagina.cursor_anterior = _codificar(['a', chave(itens[0])])
+    if itens and tem_proximo:
+        pagina.cursor_proximo = _codificar(['p', chave(itens[-1])])
+    return pagina
@@ -0,0 +1,504 @@
+import heapq
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, When, Value, BooleanField, F, Q, Count, Exists, Min, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.functions import ExtractMonth, ExtractYear, TruncMonth
+
+from pessoas.models import AlunoInfo
+from .models import Boletim, Chamada, Frequencia, Matricula, Nota, Turma
+
+
+# ---- Matrículas ----
+
+def recontar_alunos(turmas=None):
+    """
+    Recalcula Turma.total_alunos com um único UPDATE por subconsulta.
+    Usado pelos caminhos em lote (bulk_create/update) e pelo comando de reparo.
+    """
+    ativas = Matricula.objects.filter(
+        turma=OuterRef('pk'),
+        ativa=True
+    ).order_by().values('turma').annotate(total=Count('pk')).values('total')
+
+    alvo = Turma.objects.all() if turmas is None else Turma.objects.filter(pk__in=turmas)
+    return alvo.update(total_alunos=Coalesce(Subquery(ativas), 0))
+
+
+def _ler_ids(valores):
+    ids = set()
+    for valor in valores:
+        try:
+            ids.add(int(valor))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+def matricular_alunos(turma, alunos_ids):
+    """
+    Matricula os alunos informados na turma com uma validação, um UPDATE e um
+    INSERT em lote, independentemente da quantidade. Matrículas canceladas são
+    reativadas. Devolve as contagens de adicionados, reativados, ignorados (já
+    ativos na turma) e inválidos, além do nome de cada aluno válido.
+    """
+    ids = _ler_ids(alunos_ids)
+    nomes = dict(
+        AlunoInfo.objects.filter(pk__in=ids, papel__ativo=True).values_list('pk', 'papel__pessoa__nome')
+    )
+    resultado = {'adicionados': 0, 'reativados': 0, 'ignorados': 0, 'invalidos': len(ids - nomes.keys()), 'nomes': nomes}
+    if not nomes:
+        return resultado
+
+    with transaction.atomic():
+        _travar_turma(turma)
+        existentes = dict(
+            Matricula.objects.filter(turma=turma, aluno_id__in=nomes).values_list('aluno_id', 'ativa')
+        )
+        reativar = [aluno_id for aluno_id, ativa in existentes.items() if not ativa]
+        novos = [aluno_id for aluno_id in nomes if aluno_id not in existentes]
+
+        if reativar:
+            resultado['reativados'] = Matricula.objects.filter(
+                turma=turma, aluno_id__in=reativar
+            ).update(ativa=True, situacao='ATIVA')
+        Matricula.objects.bulk_create(
+            [Matricula(aluno_id=aluno_id, turma=turma, situacao='ATIVA', ativa=True) for aluno_id in novos],
+            ignore_conflicts=True
+        )
+        resultado['adicionados'] = len(novos)
+        resultado['ignorados'] = len(existentes) - len(reativar)
+        recontar_alunos([turma.pk])
+    return resultado
+
+
+# Faixa etária esperada em cada série (idade completa na data de referência)
+FAIXA_ETARIA_POR_SERIE = {
+    serie: (indice + 6, indice + 7) for indice, (serie, _) in enumerate(Turma.SERIE_CHOICES)
+}
+CAPACIDADE_TURMA = 30
+
+
+def _anos_antes(data, anos):
+    try:
+        return data.replace(year=data.year - anos)
+    except ValueError:
+        # 29 de fevereiro em ano não bissexto
+        return data.replace(year=data.year - anos, day=28)
+
+
+def intervalo_nascimento(serie, referencia=None):
+    """
+    Converte a faixa etária da série em datas de nascimento (início exclusivo,
+    fim inclusivo), para que a elegibilidade seja filtrada e indexada no banco.
+    """
+    referencia = referencia or date.today()
+    idade_minima, idade_maxima = FAIXA_ETARIA_POR_SERIE[serie]
+    return _anos_antes(referencia, idade_maxima + 1), _anos_antes(referencia, idade_minima)
+
+
+def alocar_automaticamente(turma, capacidade=CAPACIDADE_TURMA, referencia=None):
+    """
+    Matricula alunos ativos sem turma no ano letivo, com idade compatível, nas
+    turmas ativas da mesma série, período e ano, até a capacidade de cada uma.
+    Os alunos vão sempre para a turma com mais vagas, mantendo-as equilibradas.
+    Devolve {turma_id: quantidade de alunos matriculados}.
+    """
+    nascidos_depois, nascidos_ate = intervalo_nascimento(turma.serie, referencia)
+
+    with transaction.atomic():
+        turmas = list(
+            Turma.objects.select_for_update().filter(
+                ativa=True, serie=turma.serie, periodo=turma.periodo, ano_letivo=turma.ano_letivo
+            ).order_by('pk').values_list('pk', 'total_alunos')
+        )
+        vagas = [(total - capacidade, pk) for pk, total in turmas if total < capacidade]
+        total_vagas = -sum(livres for livres, _ in vagas)
+        if not total_vagas:
+            return {}
+
+        elegiveis = list(
+            AlunoInfo.objects.filter(
+                papel__ativo=True,
+                papel__pessoa__data_nascimento__gt=nascidos_depois,
+                papel__pessoa__data_nascimento__lte=nascidos_ate,
+            ).exclude(
+                Exists(Matricula.objects.filter(aluno=OuterRef('pk'), turma__in=[pk for pk, _ in turmas]))
+            ).exclude(
+                Exists(Matricula.objects.filter(
+                    aluno=OuterRef('pk'), ativa=True, turma__ano_letivo=turma.ano_letivo
+                ))
+            ).order_by('papel__pessoa__nome', 'pk').values_list('pk', flat=True)[:total_vagas]
+        )
+
+        # Heap pelas vagas livres (negativas): a turma mais vazia recebe o próximo aluno
+        heapq.heapify(vagas)
+        alocados = defaultdict(int)
+        novas = []
+        for aluno_id in elegiveis:
+            livres, turma_id = heapq.heappop(vagas)
+            novas.append(Matricula(aluno_id=aluno_id, turma_id=turma_id, situacao='ATIVA', ativa=True))
+            alocados[turma_id] += 1
+            if livres + 1 < 0:
+                heapq.heappush(vagas, (livres + 1, turma_id))
+
+        Matricula.objects.bulk_create(novas)
+        recontar_alunos(alocados)
+    return dict(alocados)
+
+
+# ---- Chamada ----
+
+def _travar_turma(turma):
+    """Serializa as escritas de chamada da mesma turma até o fim da transação"""
+    list(Turma.objects.select_for_update().filter(pk=turma.pk).values_list('pk', flat=True))
+
+
+def _ajustar_frequencia(turma, data, alunos_ids, aulas=0, presencas=0, faltas=0, criar=True):
+    """
+    Aplica um delta ao consolidado mensal (Frequencia) dos alunos informados,
+    criando as linhas do mês quando ainda não existem (a menos que criar=False).
+    """
+    if not alunos_ids:
+        return
+    turma_id = getattr(turma, 'pk', turma)
+    if criar:
+        Frequencia.objects.bulk_create(
+            [Frequencia(aluno_id=aluno_id, turma_id=turma_id, mes=data.month, ano=data.year) for aluno_id in alunos_ids],
+            ignore_conflicts=True
+        )
+    Frequencia.objects.filter(
+        turma_id=turma_id,
+        mes=data.month,
+        ano=data.year,
+        aluno_id__in=alunos_ids
+    ).update(
+        total_aulas=F('total_aulas') + aulas,
+        total_presencas=F('total_presencas') + presencas,
+        total_faltas=F('total_faltas') + faltas
+    )
+
+
+def abrir_chamada(turma, data):
+    """
+    Garante um registro de chamada para cada matrícula ativa da turma na data.
+    Os registros novos entram com um único INSERT em lote (como presentes) e
+    são somados à Frequencia do mês.
+    """
+    def alunos_sem_chamada():
+        existentes = set(Chamada.objects.filter(turma=turma, data=data).values_list('aluno_id', flat=True))
+        return [
+            aluno_id for aluno_id in Matricula.objects.filter(turma=turma, ativa=True).values_list('aluno_id', flat=True)
+            if aluno_id not in existentes
+        ]
+
+    # Caso comum: chamada do dia já aberta, sem precisar de trava
+    if not alunos_sem_chamada():
+        return
+
+    with transaction.atomic():
+        _travar_turma(turma)
+        novos = alunos_sem_chamada()
+        Chamada.objects.bulk_create(
+            [Chamada(turma=turma, aluno_id=aluno_id, data=data, presente=True) for aluno_id in novos],
+            ignore_conflicts=True
+        )
+        _ajustar_frequencia(turma, data, novos, aulas=1, presencas=1)
+
+
+def registrar_chamada(turma, data, presentes_ids):
+    """
+    Aplica a chamada enviada: os ids informados ficam presentes e o restante
+    da turma na data fica ausente, em um único UPDATE. Só os alunos que
+    mudaram de situação alteram a Frequencia do mês.
+    """
+    presentes_ids = set(presentes_ids)
+    with transaction.atomic():
+        _travar_turma(turma)
+        chamadas = Chamada.objects.filter(turma=turma, data=data)
+
+        passaram_a_presente = []
+        passaram_a_falta = []
+        for chamada_id, aluno_id, presente in chamadas.values_list('id', 'aluno_id', 'presente'):
+            if chamada_id in presentes_ids and not presente:
+                passaram_a_presente.append(aluno_id)
+            elif chamada_id not in presentes_ids and presente:
+                passaram_a_falta.append(aluno_id)
+
+        atualizadas = chamadas.update(
+            presente=Case(
+                When(pk__in=presentes_ids, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField()
+            )
+        )
+        _ajustar_frequencia(turma, data, passaram_a_presente, presencas=1, faltas=-1)
+        _ajustar_frequencia(turma, data, passaram_a_falta, presencas=-1, faltas=1)
+    return atualizadas
+
+
+def reconstruir_frequencias(turmas=None, tamanho_lote=50):
+    """
+    Recalcula a Frequencia a partir das chamadas, processando as turmas em
+    lotes (uma transação por lote). Retorna o total de linhas geradas.
+    """
+    turmas_ids = list((turmas if turmas is not None else Turma.objects.all()).order_by('pk').values_list('pk', flat=True))
+
+    total = 0
+    for inicio in range(0, len(turmas_ids), tamanho_lote):
+        lote = turmas_ids[inicio:inicio + tamanho_lote]
+        meses = Chamada.objects.filter(turma_id__in=lote).annotate(
+            mes=ExtractMonth('data'),
+            ano=ExtractYear('data')
+        ).values('aluno_id', 'turma_id', 'mes', 'ano').annotate(
+            total_aulas=Count('id'),
+            total_presencas=Count('id', filter=Q(presente=True))
+        ).order_by()
+
+        with transaction.atomic():
+            Frequencia.objects.filter(turma_id__in=lote).delete()
+            criadas = Frequencia.objects.bulk_create(
+                (
+                    Frequencia(total_faltas=mes['total_aulas'] - mes['total_presencas'], **mes)
+                    for mes in meses
+                ),
+                batch_size=1000
+            )
+        total += len(criadas)
+    return total
+
+
+def _percentual(presentes, total):
+    return (presentes / total) * 100 if total > 0 else 0
+
+
+def resumo_frequencia(aluno, turmas_ids):
+    """
+    Resume a frequência do aluno por turma e por mês em uma única consulta
+    agrupada (turma, mês). Retorna {turma_id: resumo} para todas as turmas
+    informadas, com os meses do mais recente para o mais antigo.
+    """
+    meses = Chamada.objects.filter(
+        aluno=aluno,
+        turma_id__in=turmas_ids
+    ).annotate(
+        mes_data=TruncMonth('data')
+    ).values('turma_id', 'mes_data').annotate(
+        total_aulas=Count('id'),
+        presentes=Count('id', filter=Q(presente=True)),
+        primeira_aula=Min('data'),
+        ultima_aula=Max('data')
+    ).order_by('turma_id', '-mes_data')
+
+    resumos = {
+        turma_id: {
+            'total_aulas': 0,
+            'total_presente': 0,
+            'primeira_aula': None,
+            'ultima_aula': None,
+            'frequencia_mensal': [],
+        }
+        for turma_id in turmas_ids
+    }
+    for mes in meses:
+        resumo = resumos[mes['turma_id']]
+        resumo['total_aulas'] += mes['total_aulas']
+        resumo['total_presente'] += mes['presentes']
+        # Meses vêm do mais recente ao mais antigo
+        resumo['primeira_aula'] = mes['primeira_aula']
+        resumo['ultima_aula'] = resumo['ultima_aula'] or mes['ultima_aula']
+        resumo['frequencia_mensal'].append({
+            'mes_ano': f"{mes['mes_data'].month:02d}/{mes['mes_data'].year}",
+            'mes': mes['mes_data'].month,
+            'ano': mes['mes_data'].year,
+            'total_aulas': mes['total_aulas'],
+            'presentes': mes['presentes'],
+            'faltas': mes['total_aulas'] - mes['presentes'],
+            'percentual': _percentual(mes['presentes'], mes['total_aulas']),
+        })
+
+    for resumo in resumos.values():
+        resumo['total_faltas'] = resumo['total_aulas'] - resumo['total_presente']
+        resumo['percentual_presenca'] = _percentual(resumo['total_presente'], resumo['total_aulas'])
+    return resumos
+
+
+# ---- Notas ----
+
+NOTA_MINIMA = Decimal('0')
+NOTA_MAXIMA = Decimal('10')
+
+
+def _ler_nota(valor):
+    """Converte o valor digitado (aceita vírgula) em Decimal com duas casas"""
+    try:
+        nota = Decimal(valor.replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError('valor não numérico')
+    if not nota.is_finite() or not NOTA_MINIMA <= nota <= NOTA_MAXIMA:
+        raise ValueError('a nota deve estar entre 0 e 10')
+    return nota.quantize(Decimal('0.01'))
+
+
+def _ler_celula(key, alunos_ids, disciplinas_ids):
+    """Identifica aluno, disciplina e bimestre a partir do nome do campo"""
+    try:
+        aluno_id, disciplina_id, bimestre_index = (int(parte) for parte in key.split('_')[1:])
+    except ValueError:
+        raise ValueError('campo inválido')
+
+    celula = {'aluno_id': aluno_id, 'disciplina_id': disciplina_id, 'bimestre': bimestre_index + 1}
+    if aluno_id not in alunos_ids:
+        raise ValueError('aluno sem matrícula ativa na turma')
+    if disciplina_id not in disciplinas_ids:
+        raise ValueError('disciplina não atribuída ao professor')
+    if celula['bimestre'] not in dict(Nota.BIMESTRE_CHOICES):
+        raise ValueError('bimestre inválido')
+    return celula
+
+
+def salvar_notas(turma, dados, alunos_ids, disciplinas_ids):
+    """
+    Grava em lote as notas enviadas pelo diário no formato
+    nota_<aluno>_<disciplina>_<índice do bimestre>.
+
+    Todo o formulário é validado antes de escrever: células preenchidas viram
+    um único INSERT ... ON CONFLICT e células vazias um único DELETE, ambos na
+    mesma transação. Retorna um relatório com as células rejeitadas.
+    """
+    alunos_ids = {int(pk) for pk in alunos_ids}
+    disciplinas_ids = {int(pk) for pk in disciplinas_ids}
+
+    gravar = []
+    remover = []
+    rejeitadas = []
+
+    for key, valor in dados.items():
+        if not key.startswith('nota_'):
+            continue
+        try:
+            celula = _ler_celula(key, alunos_ids, disciplinas_ids)
+            if valor.strip():
+                gravar.append(Nota(turma=turma, nota=_ler_nota(valor.strip()), **celula))
+            else:
+                remover.append(celula)
+        except ValueError as erro:
+            rejeitadas.append({'campo': key, 'valor': valor, 'erro': str(erro)})
+
+    removidas = 0
+    with transaction.atomic():
+        if gravar:
+            Nota.objects.bulk_create(
+                gravar,
+                update_conflicts=True,
+                unique_fields=['aluno', 'disciplina', 'turma', 'bimestre'],
+                update_fields=['nota']
+            )
+        if remover:
+            removidas, _ = Nota.objects.filter(turma=turma).filter(
+                reduce(or_, (Q(**celula) for celula in remover))
+            ).delete()
+        # O DELETE emite post_delete por nota, e o sinal já recalcula essas linhas
+        atualizar_boletim(turma, {(nota.aluno_id, nota.disciplina_id) for nota in gravar})
+
+    return {
+        'gravadas': len(gravar),
+        'removidas': removidas,
+        'rejeitadas': rejeitadas,
+    }
+
+
+def matriz_notas(turma, professor=None):
+    """
+    Carrega todas as notas da turma (opcionalmente só das disciplinas do
+    professor) em uma consulta e as organiza em memória como
+    {(aluno_id, disciplina_id): [nota do 1º, 2º, 3º e 4º bimestre]}.
+    Bimestres sem nota ficam como None.
+    """
+    notas = Nota.objects.filter(turma=turma)
+    if professor is not None:
+        notas = notas.filter(disciplina__professor=professor)
+
+    matriz = defaultdict(lambda: [None] * len(Nota.BIMESTRE_CHOICES))
+    for aluno_id, disciplina_id, bimestre, nota in notas.order_by().values_list(
+        'aluno_id', 'disciplina_id', 'bimestre', 'nota'
+    ):
+        matriz[(aluno_id, disciplina_id)][bimestre - 1] = nota
+    return dict(matriz)
+
+
+# ---- Boletim ----
+
+def _media(notas):
+    notas_validas = [nota for nota in notas if nota is not None]
+    if not notas_validas:
+        return None
+    return round(sum(notas_validas) / len(notas_validas), 2)
+
+
+def atualizar_boletim(turma, pares):
+    """
+    Recalcula as linhas de Boletim da turma para os pares (aluno_id, disciplina_id)
+    informados: uma leitura das notas, um INSERT ... ON CONFLICT para as linhas
+    com nota e um DELETE para as que ficaram vazias.
+    """
+    turma_id = getattr(turma, 'pk', turma)
+    pares = set(pares)
+    if not pares:
+        return
+
+    notas = Nota.objects.filter(
+        turma_id=turma_id,
+        aluno_id__in={aluno_id for aluno_id, _ in pares},
+        disciplina_id__in={disciplina_id for _, disciplina_id in pares}
+    ).order_by().values_list('aluno_id', 'disciplina_id', 'bimestre', 'nota')
+
+    linhas = {}
+    for aluno_id, disciplina_id, bimestre, nota in notas:
+        if (aluno_id, disciplina_id) not in pares:
+            continue
+        linha = linhas.setdefault((aluno_id, disciplina_id), Boletim(
+            aluno_id=aluno_id, turma_id=turma_id, disciplina_id=disciplina_id
+        ))
+        setattr(linha, f'nota_{bimestre}', nota)
+
+    for linha in linhas.values():
+        linha.media = _media(linha.notas)
+
+    vazios = pares - linhas.keys()
+    with transaction.atomic():
+        if linhas:
+            Boletim.objects.bulk_create(
+                linhas.values(),
+                update_conflicts=True,
+                unique_fields=['aluno', 'turma', 'disciplina'],
+                update_fields=['nota_1', 'nota_2', 'nota_3', 'nota_4', 'media', 'atualizado_em']
+            )
+        if vazios:
+            Boletim.objects.filter(turma_id=turma_id).filter(
+                reduce(or_, (Q(aluno_id=aluno_id, disciplina_id=disciplina_id) for aluno_id, disciplina_id in vazios))
+            ).delete()
+
+
+def reconstruir_boletins(turmas=None):
+    """Apaga e recalcula o boletim a partir das notas lançadas (todas ou só das turmas informadas)"""
+    notas = Nota.objects.order_by()
+    boletins = Boletim.objects.all()
+    if turmas is not None:
+        notas = notas.filter(turma__in=turmas)
+        boletins = boletins.filter(turma__in=turmas)
+
+    pares_por_turma = defaultdict(set)
+    for turma_id, aluno_id, disciplina_id in notas.values_list('turma_id', 'aluno_id', 'disciplina_id').distinct():
+        pares_por_turma[turma_id].add((aluno_id, disciplina_id))
+
+    with transaction.atomic():
+        boletins.delete()
+        for turma_id, pares in pares_por_turma.items():
+            atualizar_boletim(turma_id, pares)
+    return sum(len(pares) for pares in pares_por_turma.values())
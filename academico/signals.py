@@ -0,0 +1,135 @@
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from pessoas.models import AlunoInfo, Papel, ProfessorInfo
+from .estatisticas import invalidar_estatisticas
+from .models import Chamada, Disciplina, Matricula, Nota, Turma
+from .services import _ajustar_frequencia, atualizar_boletim
+
+_boletins_pendentes = threading.local()
+
+
+@receiver(pre_delete, sender=Matricula)
+def lembrar_contagem_da_matricula(sender, instance, **kwargs):
+    """Matrícula com turma ou ativa adiados: lê do banco o que ela contava antes de excluí-la"""
+    if getattr(instance, '_contagem_original', None) is None:
+        instance._contagem_original = instance.contagem_no_banco()
+
+
+@receiver(post_delete, sender=Matricula)
+def descontar_matricula_excluida(sender, instance, **kwargs):
+    """Mantém Turma.total_alunos ao excluir matrículas (inclusive em cascata)"""
+    turma_id, ativa = instance._contagem_original or (None, False)
+    if ativa:
+        Turma.objects.filter(pk=turma_id).update(total_alunos=F('total_alunos') - 1)
+
+
+@receiver(post_save, sender=Turma)
+@receiver(post_delete, sender=Turma)
+@receiver(post_save, sender=Disciplina)
+@receiver(post_delete, sender=Disciplina)
+@receiver(post_save, sender=Papel)
+@receiver(post_delete, sender=Papel)
+@receiver(post_save, sender=AlunoInfo)
+@receiver(post_delete, sender=AlunoInfo)
+@receiver(post_save, sender=ProfessorInfo)
+@receiver(post_delete, sender=ProfessorInfo)
+def vencer_estatisticas(sender, **kwargs):
+    """Vence o retrato dos dashboards depois que a alteração for gravada"""
+    transaction.on_commit(invalidar_estatisticas)
+
+
+def _atualizar_boletins_pendentes():
+    pendentes = getattr(_boletins_pendentes, 'pares', None)
+    _boletins_pendentes.pares = None
+    for turma_id, pares in (pendentes or {}).items():
+        atualizar_boletim(turma_id, pares)
+
+
+def _agendar_boletim(turma_id, aluno_id, disciplina_id):
+    """
+    Acumula as linhas de Boletim afetadas e recalcula todas de uma vez depois
+    do commit. Cada nota registra o mesmo callback; o primeiro a rodar esvazia
+    a fila e os demais não fazem nada. Se a transação for desfeita, as linhas
+    ficam para o próximo commit, o que é inofensivo: o recálculo parte das notas.
+    """
+    if getattr(_boletins_pendentes, 'pares', None) is None:
+        _boletins_pendentes.pares = defaultdict(set)
+    _boletins_pendentes.pares[turma_id].add((aluno_id, disciplina_id))
+    transaction.on_commit(_atualizar_boletins_pendentes)
+
+
+@receiver(pre_save, sender=Nota)
+def lembrar_boletim_da_nota(sender, instance, **kwargs):
+    """Nota carregada com campos adiados: busca a linha de Boletim original antes de gravar"""
+    if not instance._state.adding and getattr(instance, '_boletim_original', None) is None:
+        instance._boletim_original = Nota.objects.filter(pk=instance.pk).values_list(
+            'turma_id', 'aluno_id', 'disciplina_id'
+        ).first()
+
+
+@receiver(post_save, sender=Nota)
+def atualizar_boletim_da_nota(sender, instance, **kwargs):
+    """
+    Mantém o Boletim em dia com qualquer gravação de nota (admin, shell,
+    views). Os lançamentos em lote do diário (salvar_notas) não emitem sinais
+    e atualizam o boletim na própria transação.
+    """
+    _agendar_boletim(*instance.chave_boletim)
+    original = getattr(instance, '_boletim_original', None)
+    if original is not None and original != instance.chave_boletim:
+        _agendar_boletim(*original)
+    instance._boletim_original = instance.chave_boletim
+
+
+@receiver(post_delete, sender=Nota)
+def atualizar_boletim_da_nota_excluida(sender, instance, **kwargs):
+    """Inclui as exclusões em cascata (aluno, turma ou disciplina removidos)"""
+    _agendar_boletim(*(getattr(instance, '_boletim_original', None) or instance.chave_boletim))
+
+
+def _contar_chamada(situacao, sinal, criar=True):
+    turma_id, aluno_id, data, presente = situacao
+    _ajustar_frequencia(
+        turma_id, data, [aluno_id], aulas=sinal,
+        presencas=sinal if presente else 0, faltas=0 if presente else sinal, criar=criar,
+    )
+
+
+@receiver(pre_save, sender=Chamada)
+def lembrar_frequencia_da_chamada(sender, instance, **kwargs):
+    """Chamada carregada com campos adiados: busca a situação contada antes de gravar"""
+    if not instance._state.adding and getattr(instance, '_frequencia_original', None) is None:
+        instance._frequencia_original = Chamada.objects.filter(pk=instance.pk).values_list(
+            'turma_id', 'aluno_id', 'data', 'presente'
+        ).first()
+
+
+@receiver(post_save, sender=Chamada)
+def contar_chamada_gravada(sender, instance, created, **kwargs):
+    """
+    Mantém a Frequencia em dia com qualquer gravação avulsa de chamada. Os
+    caminhos em lote (abrir_chamada e registrar_chamada) não emitem sinais e
+    aplicam os próprios deltas.
+    """
+    original = None if created else getattr(instance, '_frequencia_original', None)
+    if original != instance.situacao_frequencia:
+        if original is not None:
+            _contar_chamada(original, -1, criar=False)
+        _contar_chamada(instance.situacao_frequencia, 1)
+    instance._frequencia_original = instance.situacao_frequencia
+
+
+@receiver(post_delete, sender=Chamada)
+def descontar_chamada_excluida(sender, instance, origin=None, **kwargs):
+    """
+    Só as exclusões de chamadas em si: as em cascata vêm da turma ou do aluno,
+    cujas linhas de Frequencia são excluídas junto.
+    """
+    if isinstance(origin, Chamada) or getattr(origin, 'model', None) is Chamada:
+        _contar_chamada(getattr(instance, '_frequencia_original', None) or instance.situacao_frequencia, -1, criar=False)
@@ -1,3 +1,741 @@
-from django.test import TestCase
+import json
+import time
+import unittest
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from POA.concorrencia import executar_concorrentes
+from POA.testes import OrcamentoConsultasMixin
+from . import urls
+from .desempenho import participantes_da_escola
+from .gerador import GeradorEscola
+from pessoas.busca import normalizar
+from pessoas.models import AlunoInfo, Papel, Pessoa, SequenciaMatricula
+from .paginacao import _codificar
+from .models import Boletim, Chamada, Disciplina, Frequencia, Matricula, Nota, Turma
+from .services import (
+    alocar_automaticamente, matricular_alunos, reconstruir_boletins, reconstruir_frequencias, recontar_alunos,
+    resumo_frequencia, salvar_notas,
+)
+
+# Tabelas que crescem com a escola: nenhuma consulta das telas principais
+# deve percorrê-las inteiras
+TABELAS_QUENTES = {
+    'academico_chamada',
+    'academico_matricula',
+    'academico_nota',
+    'academico_boletim',
+    'academico_frequencia',
+    'academico_turma',
+}
+
+# Índices de trigramas da migração pessoas 0004, usados pela busca de alunos
+INDICES_DE_BUSCA = {'pessoa_nome_trgm', 'pessoa_email_trgm', 'alunoinfo_matricula_trgm'}
+
+NOS_QUE_CONSOMEM_TUDO = {'Sort', 'Aggregate', 'Hash', 'Group', 'Unique', 'Materialize', 'SetOp', 'WindowAgg'}
+
+
+def gerar_escola_de_teste(**opcoes):
+    """Gera uma escola pequena e devolve os participantes_da_escola()"""
+    parametros = {'alunos': 60, 'turmas': 3, 'professores': 8, 'dias': 5, 'processos': 1, 'log': lambda *_: None}
+    parametros.update(opcoes)
+    GeradorEscola(**parametros).gerar()
+    return participantes_da_escola()
+
+
+def _indices_parciais():
+    """Índices com condição (ex.: ativa=True): percorrê-los inteiros já é filtrar"""
+    return {
+        indice.name
+        for modelo in apps.get_models()
+        for indice in modelo._meta.indexes
+        if indice.condition is not None
+    }
+
+
+def _indices_usados(no):
+    """Nomes dos índices lidos em algum nó do plano"""
+    usados = {no['Index Name']} if 'Index Name' in no else set()
+    for filho in no.get('Plans', []):
+        usados |= _indices_usados(filho)
+    return usados
+
+
+def _varreduras_completas(no, parciais, limitado=False):
+    """Nós do plano que leem uma tabela quente inteira, sem condição de índice"""
+    # Um LIMIT só poupa a leitura dos nós que entregam linhas aos poucos
+    if no['Node Type'] in NOS_QUE_CONSOMEM_TUDO:
+        limitado = False
+    limitado = limitado or no['Node Type'] == 'Limit'
+    encontrados = []
+    if no.get('Relation Name') in TABELAS_QUENTES:
+        if no['Node Type'] == 'Seq Scan':
+            encontrados.append(no['Relation Name'])
+        elif (
+            no['Node Type'] in ('Index Scan', 'Index Only Scan')
+            and 'Index Cond' not in no
+            and no.get('Index Name') not in parciais
+            and not limitado
+        ):
+            encontrados.append(no['Relation Name'])
+    for filho in no.get('Plans', []):
+        encontrados.extend(_varreduras_completas(filho, parciais, limitado))
+    return encontrados
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Os planos dependem dos índices do PostgreSQL')
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PlanosDeConsultaTests(TestCase):
+    """
+    Executa as telas principais sobre uma escola gerada e confere o EXPLAIN de
+    cada SELECT. As varreduras sequenciais ficam desabilitadas na sessão, então
+    o planejador só lê uma tabela quente inteira quando não há índice que
+    atenda ao filtro: se uma mudança de esquema ou de consulta perder o
+    índice, o teste falha mostrando a consulta.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        escola = gerar_escola_de_teste(alunos=600, turmas=12, professores=10, dias=20)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        cls.turma = escola['turma']
+        cls.professor = escola['professor']
+        cls.aluno = escola['aluno']
+        cls.coordenador = escola['coordenador']
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            cursor.execute('RESET enable_seqscan')
+
+    def _planos(self, user, url):
+        """(sql, plano) de cada SELECT da tela"""
+        self.client.force_login(user)
+        # A primeira visita pode gravar (ex.: abrir a chamada do dia); mede-se a segunda
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+
+        planos = []
+        with connection.cursor() as cursor:
+            for consulta in consultas.captured_queries:
+                sql = consulta['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+                plano = cursor.fetchone()[0]
+                if isinstance(plano, str):
+                    plano = json.loads(plano)
+                planos.append((sql, plano[0]['Plan']))
+        return planos
+
+    def _varreduras(self, user, url):
+        """SELECTs da tela que leem alguma tabela quente inteira"""
+        parciais = _indices_parciais()
+        return [
+            f'{tabela}: {sql}'
+            for sql, plano in self._planos(user, url)
+            for tabela in _varreduras_completas(plano, parciais)
+        ]
+
+    def assertSemVarredura(self, user, url):
+        varreduras = self._varreduras(user, url)
+        self.assertEqual(varreduras, [], f'Varredura completa em {url}:\n' + '\n'.join(varreduras))
+
+    def test_chamada_do_dia(self):
+        self.assertSemVarredura(self.professor, reverse('academico:fazer_chamada_professor', args=[self.turma.pk]))
+
+    def test_diario_de_classe(self):
+        self.assertSemVarredura(self.professor, reverse('academico:diario_professor') + f'?turma={self.turma.pk}')
+
+    def test_listagem_de_turmas(self):
+        self.assertSemVarredura(self.coordenador, reverse('academico:listar_turmas'))
+
+    def test_listagem_de_alunos(self):
+        self.assertSemVarredura(self.coordenador, reverse('academico:listar_alunos'))
+
+    def test_busca_de_alunos(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT indexname FROM pg_indexes WHERE indexname = ANY(%s)', [list(INDICES_DE_BUSCA)])
+            if len(cursor.fetchall()) < len(INDICES_DE_BUSCA):
+                self.skipTest('Índices de trigramas ausentes (pg_trgm/unaccent não instalados)')
+
+        # Parte do nome, sem acento, como digitada na busca
+        termo = normalizar(self.aluno.pessoa.nome.split()[0])[:4]
+        url = reverse('academico:listar_alunos') + f'?search={termo}'
+        self.assertSemVarredura(self.coordenador, url)
+        usados = {indice for _, plano in self._planos(self.coordenador, url) for indice in _indices_usados(plano)}
+        self.assertEqual(INDICES_DE_BUSCA - usados, set(), 'A busca não usou todos os índices de trigramas')
+
+    def test_alunos_da_turma(self):
+        self.assertSemVarredura(self.coordenador, reverse('academico:gerenciar_alunos_turma', args=[self.turma.pk]))
+
+    def test_boletim_do_aluno(self):
+        self.assertSemVarredura(self.aluno, reverse('academico:meu_boletim'))
+
+    def test_frequencia_do_aluno(self):
+        self.assertSemVarredura(self.aluno, reverse('academico:minha_frequencia'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class OrcamentoConsultasTests(OrcamentoConsultasMixin, TestCase):
+    """Cada rota do acadêmico dentro de settings.ORCAMENTO_CONSULTAS e sem N+1"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.escola = gerar_escola_de_teste()
+
+    def test_rotas_do_academico(self):
+        escola = self.escola
+        turma = escola['turma'].pk
+        aluno = escola['aluno_info'].pk
+        disciplina = escola['disciplina'].pk
+        rotas_do_professor = [
+            'academico:minhas_turmas_professor',
+            'academico:detalhar_turma_professor',
+            'academico:alunos_turma_professor',
+            'academico:fazer_chamada_professor',
+            'academico:diario_professor',
+        ]
+        usuarios = {rota: escola['professor'] for rota in rotas_do_professor}
+        usuarios.update({
+            'academico:meu_boletim': escola['aluno'],
+            'academico:minha_frequencia': escola['aluno'],
+        })
+        argumentos = {
+            'academico:detalhar_turma': ({'pk': turma}, ''),
+            'academico:editar_turma': ({'pk': turma}, ''),
+            'academico:excluir_turma': ({'pk': turma}, ''),
+            'academico:gerenciar_alunos_turma': ({'pk': turma}, ''),
+            'academico:remover_aluno_turma': ({'turma_pk': turma, 'aluno_pk': aluno}, ''),
+            'academico:adicionar_alunos_em_lote': ({'pk': turma}, ''),
+            'academico:editar_disciplina': ({'pk': disciplina}, ''),
+            'academico:excluir_disciplina': ({'pk': disciplina}, ''),
+            'academico:detalhar_aluno': ({'pk': aluno}, ''),
+            'academico:editar_aluno': ({'pk': aluno}, ''),
+            'academico:toggle_aluno_status': ({'pk': aluno}, ''),
+            'academico:detalhar_turma_professor': ({'pk': turma}, ''),
+            'academico:alunos_turma_professor': ({'turma_pk': turma}, ''),
+            'academico:fazer_chamada_professor': ({'turma_id': turma}, ''),
+            'academico:diario_professor': ({}, f'?turma={turma}'),
+        }
+        self.assertRotasNoOrcamento(urls, escola['coordenador'], usuarios, argumentos)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ExportacaoNotasTests(TestCase):
+    """CSV de notas: uma linha por aluno, transmitido tanto por WSGI quanto por ASGI"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.escola = gerar_escola_de_teste()
+        cls.url = reverse('academico:exportar_notas')
+
+    def _linhas(self, resposta):
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta.streaming)
+        return b''.join(resposta.streaming_content).decode('utf-8-sig').splitlines()
+
+    def test_uma_linha_por_aluno_da_turma(self):
+        turma = self.escola['turma']
+        self.client.force_login(self.escola['coordenador'])
+        linhas = self._linhas(self.client.get(self.url, {'turma': turma.pk}))
+
+        alunos = Nota.objects.filter(turma=turma).values('aluno').distinct().count()
+        self.assertEqual(len(linhas), alunos + 1)
+        self.assertEqual(len(linhas[0].split(';')), 3 + 8 * 4)
+        self.assertTrue(all(linha.startswith(f'{turma.nome};') for linha in linhas[1:]))
+
+    def test_filtro_por_disciplina_e_bimestre(self):
+        self.client.force_login(self.escola['coordenador'])
+        linhas = self._linhas(self.client.get(self.url, {
+            'ano_letivo': self.escola['turma'].ano_letivo, 'disciplina': 'MAT', 'bimestre': 1,
+        }))
+        self.assertEqual(linhas[0].split(';')[3:], ['Matemática - 1º bim.'])
+        alunos = Nota.objects.filter(disciplina__nome='MAT', bimestre=1).values('turma', 'aluno').distinct().count()
+        self.assertEqual(len(linhas), alunos + 1)
+
+    def test_exige_turma_ou_ano(self):
+        self.client.force_login(self.escola['coordenador'])
+        resposta = self.client.get(self.url, {'ano_letivo': '', 'disciplina': 'MAT'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertFalse(resposta.streaming)
+        self.assertContains(resposta, 'Escolha uma turma ou informe o ano letivo.')
+
+    async def test_transmissao_assincrona(self):
+        cliente = AsyncClient()
+        await cliente.aforce_login(self.escola['coordenador'])
+        resposta = await cliente.get(self.url, {'turma': self.escola['turma'].pk})
+        self.assertEqual(resposta.status_code, 200)
+        partes = [parte async for parte in resposta.streaming_content]
+        self.assertTrue(b''.join(partes).decode('utf-8-sig').startswith('Turma;Matrícula;Aluno;'))
+
+
+@unittest.skipUnless(
+    connection.settings_dict['OPTIONS'].get('pool'), 'Sem o pool (DB_POOL=1) as consultas rodam em sequência'
+)
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ConsultasConcorrentesTests(TransactionTestCase):
+    """Com o pool, as consultas dos dashboards rodam ao mesmo tempo, cada uma com sua conexão"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_tempo_da_consulta_mais_lenta(self):
+        def esperar():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_backend_pid() FROM pg_sleep(0.3)')
+                return cursor.fetchone()[0]
+
+        inicio = time.perf_counter()
+        processos = async_to_sync(executar_concorrentes)(esperar, esperar, esperar)
+        self.assertLess(time.perf_counter() - inicio, 0.6)
+        self.assertEqual(len(set(processos)), 3)
+
+    async def test_dashboard_academico(self):
+        escola = await sync_to_async(gerar_escola_de_teste)()
+        cliente = AsyncClient()
+        await cliente.aforce_login(escola['coordenador'])
+        resposta = await cliente.get(reverse('academico:dashboard'))
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.context['total_turmas'], await Turma.objects.filter(ativa=True).acount())
+        self.assertEqual(resposta.context['total_alunos'], await AlunoInfo.objects.filter(papel__ativo=True).acount())
+        self.assertEqual(len(resposta.context['turmas_recentes']), await Turma.objects.filter(ativa=True).acount())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BoletimTests(TestCase):
+    """O Boletim consolidado é sempre igual ao recalculado a partir das notas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.escola = gerar_escola_de_teste()
+
+    def _boletins(self):
+        return list(Boletim.objects.order_by('turma', 'aluno', 'disciplina').values_list(
+            'turma', 'aluno', 'disciplina', 'nota_1', 'nota_2', 'nota_3', 'nota_4', 'media'
+        ))
+
+    def assertBoletimConsistente(self):
+        consolidado = self._boletins()
+        reconstruir_boletins()
+        self.assertEqual(consolidado, self._boletins())
+
+    def test_gravacao_avulsa(self):
+        nota = Nota.objects.filter(turma=self.escola['turma']).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            nota.nota = 0 if nota.nota else 10
+            nota.save()
+        self.assertBoletimConsistente()
+
+    def _liberar_outra_disciplina(self, nota):
+        """Exclui a nota do mesmo aluno e bimestre em outra disciplina e devolve essa disciplina"""
+        vizinha = Nota.objects.filter(
+            aluno=nota.aluno_id, turma=nota.turma_id, bimestre=nota.bimestre
+        ).exclude(pk=nota.pk).first()
+        vizinha.delete()
+        return vizinha.disciplina_id
+
+    def test_nota_movida_de_disciplina(self):
+        nota = Nota.objects.filter(turma=self.escola['turma']).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            nota.disciplina_id = self._liberar_outra_disciplina(nota)
+            nota.save()
+        self.assertBoletimConsistente()
+
+    def test_campos_adiados(self):
+        nota = Nota.objects.filter(turma=self.escola['turma']).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            disciplina_id = self._liberar_outra_disciplina(nota)
+            nota = Nota.objects.only('nota').get(pk=nota.pk)
+            nota.disciplina_id = disciplina_id
+            nota.save()
+        self.assertBoletimConsistente()
+
+    def test_exclusoes(self):
+        turma = self.escola['turma']
+        with self.captureOnCommitCallbacks(execute=True):
+            Nota.objects.filter(turma=turma).first().delete()
+            Nota.objects.filter(turma=turma, bimestre=2).delete()
+            Nota.objects.filter(aluno=self.escola['aluno_info']).delete()
+        self.assertBoletimConsistente()
+
+    def test_transacao_desfeita_nao_deixa_o_boletim_para_tras(self):
+        nota = Nota.objects.filter(turma=self.escola['turma']).first()
+        try:
+            with transaction.atomic():
+                nota.delete()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        with self.captureOnCommitCallbacks(execute=True):
+            Nota.objects.filter(turma=self.escola['turma']).last().delete()
+        self.assertBoletimConsistente()
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class FrequenciaTests(TestCase):
+    """A Frequencia consolidada é sempre igual à recontagem das chamadas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.escola = gerar_escola_de_teste()
+
+    def _frequencias(self):
+        return list(Frequencia.objects.order_by('turma', 'aluno', 'ano', 'mes').values_list(
+            'turma', 'aluno', 'ano', 'mes', 'total_aulas', 'total_presencas', 'total_faltas'
+        ))
+
+    def assertFrequenciaConsistente(self):
+        # Meses que ficaram sem aulas continuam como linhas zeradas no consolidado
+        consolidado = [linha for linha in self._frequencias() if linha[4]]
+        reconstruir_frequencias()
+        self.assertEqual(consolidado, self._frequencias())
+
+    def _chamada(self):
+        return Chamada.objects.filter(turma=self.escola['turma']).first()
+
+    def test_chamada_avulsa(self):
+        chamada = self._chamada()
+        Chamada.objects.create(turma=chamada.turma, aluno=chamada.aluno, data=date(2000, 1, 3), presente=False)
+        self.assertFrequenciaConsistente()
+
+    def test_presenca_alterada(self):
+        chamada = self._chamada()
+        chamada.presente = not chamada.presente
+        chamada.save()
+        self.assertFrequenciaConsistente()
+
+    def test_chamada_movida_de_mes(self):
+        chamada = self._chamada()
+        chamada.data = date(2000, 1, 3)
+        chamada.save()
+        self.assertFrequenciaConsistente()
+
+    def test_campos_adiados(self):
+        chamada = Chamada.objects.only('observacao').get(pk=self._chamada().pk)
+        chamada.presente = not Chamada.objects.get(pk=chamada.pk).presente
+        chamada.save()
+        self.assertFrequenciaConsistente()
+
+    def test_exclusoes(self):
+        self._chamada().delete()
+        Chamada.objects.filter(turma=self.escola['turma'], presente=False).delete()
+        self.assertFrequenciaConsistente()
+
+    def test_exclusao_em_cascata(self):
+        self.escola['aluno_info'].delete()
+        Chamada.objects.filter(turma=self.escola['turma']).first().turma.delete()
+        self.assertFrequenciaConsistente()
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TotalAlunosTests(TestCase):
+    """Turma.total_alunos é sempre igual à recontagem das matrículas ativas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.escola = gerar_escola_de_teste()
+        cls.outra_turma = Turma.objects.exclude(pk=cls.escola['turma'].pk).first()
+
+    def assertTotaisConsistentes(self):
+        totais = dict(Turma.objects.values_list('pk', 'total_alunos'))
+        recontar_alunos()
+        self.assertEqual(totais, dict(Turma.objects.values_list('pk', 'total_alunos')))
+
+    def _matricula(self):
+        return Matricula.objects.filter(turma=self.escola['turma'], ativa=True).first()
+
+    def test_criacao(self):
+        aluno = Matricula.objects.filter(turma=self.outra_turma).first().aluno
+        Matricula.objects.create(aluno=aluno, turma=self.escola['turma'])
+        self.assertTotaisConsistentes()
+
+    def test_mudanca_de_turma(self):
+        matricula = Matricula.objects.filter(turma=self.escola['turma']).exclude(
+            aluno__matriculas__turma=self.outra_turma
+        ).first()
+        matricula.turma = self.outra_turma
+        matricula.save()
+        self.assertTotaisConsistentes()
+
+    def test_desativacao_e_reativacao(self):
+        matricula = self._matricula()
+        matricula.ativa = False
+        matricula.save()
+        self.assertTotaisConsistentes()
+        matricula.ativa = True
+        matricula.save()
+        self.assertTotaisConsistentes()
+
+    def test_campos_adiados(self):
+        Matricula.objects.only('situacao').get(pk=self._matricula().pk).save()
+        self.assertTotaisConsistentes()
+        matricula = Matricula.objects.defer('ativa').get(pk=self._matricula().pk)
+        matricula.ativa = False
+        matricula.save()
+        self.assertTotaisConsistentes()
+
+    def test_exclusoes(self):
+        self._matricula().delete()
+        Matricula.objects.only('pk').get(pk=self._matricula().pk).delete()
+        Matricula.objects.filter(turma=self.outra_turma)[:1].get().delete()
+        Matricula.objects.filter(aluno=self.escola['aluno_info']).delete()
+        self.assertTotaisConsistentes()
+
+    def test_caminhos_em_lote(self):
+        turma = self.escola['turma']
+        inativa = self._matricula()
+        inativa.ativa = False
+        inativa.save()
+        fora = list(Matricula.objects.filter(turma=self.outra_turma).values_list('aluno_id', flat=True)[:3])
+        matricular_alunos(turma, fora + [inativa.aluno_id])
+        self.assertTotaisConsistentes()
+        Matricula.objects.filter(turma=turma, aluno_id__in=fora).delete()
+        alocar_automaticamente(turma)
+        self.assertTotaisConsistentes()
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class EdicaoMatriculaTests(TestCase):
+    """Matrícula editada à mão não pode colidir com outra nem com a numeração automática"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.escola = gerar_escola_de_teste()
+
+    def _editar(self, matricula):
+        aluno = self.escola['aluno_info']
+        self.client.force_login(self.escola['coordenador'])
+        return self.client.post(reverse('academico:editar_aluno', kwargs={'pk': aluno.pk}), {'matricula': matricula})
+
+    def test_matricula_de_outro_aluno(self):
+        outro = AlunoInfo.objects.exclude(pk=self.escola['aluno_info'].pk).first()
+        self.assertContains(self._editar(outro.matricula), 'Matrícula já usada por outro aluno.')
+
+    def test_numero_ainda_nao_emitido(self):
+        sequencia = SequenciaMatricula.objects.get()
+        proxima = SequenciaMatricula.formatar(sequencia.ano, sequencia.ultimo + 1)
+        self.assertContains(self._editar(proxima), 'ainda será gerado pela numeração automática')
+
+    def test_numero_livre(self):
+        self.assertRedirects(self._editar('TRANSF-001'), reverse('academico:listar_alunos'), fetch_redirect_response=False)
+        self.escola['aluno_info'].refresh_from_db()
+        self.assertEqual(self.escola['aluno_info'].matricula, 'TRANSF-001')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PaginacaoTurmasTests(TestCase):
+    """Listagem de turmas paginada por cursor"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.escola = gerar_escola_de_teste(turmas=25)
+        cls.url = reverse('academico:listar_turmas')
+
+    def setUp(self):
+        # Retrato dos contadores deixado por outros testes (o on_commit da geração não roda no TestCase)
+        cache.clear()
+        self.client.force_login(self.escola['coordenador'])
+
+    def test_total_de_turmas_e_nao_da_pagina(self):
+        resposta = self.client.get(self.url)
+        self.assertEqual(len(resposta.context['page_obj']), 20)
+        self.assertContains(resposta, '25 turmas')
+
+    def test_cursor_com_tipos_trocados_volta_a_primeira_pagina(self):
+        primeira = self.client.get(self.url).context['page_obj']
+        for valores in (['1º A', 'abc'], [1, 2], ['1º A', True], ['1º A', 1.5]):
+            with self.subTest(valores=valores):
+                resposta = self.client.get(self.url, {'cursor': _codificar(['p', valores])})
+                self.assertEqual(resposta.status_code, 200)
+                self.assertEqual(list(resposta.context['page_obj']), list(primeira))
+
+    def test_cursor_valido_avanca(self):
+        primeira = self.client.get(self.url).context['page_obj']
+        segunda = self.client.get(self.url, {'cursor': primeira.cursor_proximo}).context['page_obj']
+        self.assertEqual(len(segunda), 5)
+        self.assertFalse(set(segunda) & set(primeira))
+
+
+def criar_alunos(quantidade, nascimento, prefixo='aluno', ativos=True):
+    """Cria `quantidade` alunos com a mesma data de nascimento e devolve os AlunoInfo"""
+    users = User.objects.bulk_create([User(username=f'{prefixo}{i}') for i in range(quantidade)])
+    pessoas = Pessoa.objects.bulk_create([
+        Pessoa(user=user, nome=f'{prefixo.title()} {i:03d}', cpf=f'{prefixo[:3]}{i:08d}', data_nascimento=nascimento)
+        for i, user in enumerate(users)
+    ])
+    papeis = Papel.objects.bulk_create([Papel(pessoa=pessoa, tipo=Papel.ALUNO, ativo=ativos) for pessoa in pessoas])
+    return AlunoInfo.objects.bulk_create([
+        AlunoInfo(papel=papel, matricula=f'{prefixo[:3].upper()}{i:05d}') for i, papel in enumerate(papeis)
+    ])
+
+
+class MatriculaEmLoteTests(TestCase):
+    """matricular_alunos: contagens do resultado e o total de alunos da turma"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.turma = Turma.objects.create(nome='1º A', serie='1ANO', periodo='MATUTINO', ano_letivo=2030)
+        cls.novos = criar_alunos(2, date(2023, 5, 10), 'novo')
+        cls.ja_ativo, cls.cancelado = criar_alunos(2, date(2023, 5, 10), 'antigo')
+        cls.inativo, = criar_alunos(1, date(2023, 5, 10), 'inativo', ativos=False)
+        Matricula.objects.create(aluno=cls.ja_ativo, turma=cls.turma)
+        Matricula.objects.create(aluno=cls.cancelado, turma=cls.turma, ativa=False, situacao='CANCELADA')
+
+    def test_resultado(self):
+        ids = [aluno.pk for aluno in self.novos] + [self.ja_ativo.pk, self.cancelado.pk, self.inativo.pk, 999999, 'abc']
+        resultado = matricular_alunos(self.turma, ids)
+
+        self.assertEqual(
+            {chave: resultado[chave] for chave in ('adicionados', 'reativados', 'ignorados', 'invalidos')},
+            {'adicionados': 2, 'reativados': 1, 'ignorados': 1, 'invalidos': 2},
+        )
+        self.assertEqual(resultado['nomes'][self.novos[0].pk], 'Novo 000')
+        self.assertEqual(Matricula.objects.get(aluno=self.cancelado).situacao, 'ATIVA')
+        self.turma.refresh_from_db()
+        self.assertEqual(self.turma.total_alunos, 4)
+
+    def test_repetir_nao_duplica(self):
+        ids = [aluno.pk for aluno in self.novos]
+        matricular_alunos(self.turma, ids)
+        resultado = matricular_alunos(self.turma, ids)
+        self.assertEqual((resultado['adicionados'], resultado['ignorados']), (0, 2))
+        self.assertEqual(Matricula.objects.filter(turma=self.turma).count(), 4)
+
+
+class AlocacaoAutomaticaTests(TestCase):
+    """alocar_automaticamente: capacidade de 30 por turma, faixa etária e alunos já matriculados"""
+
+    referencia = date(2030, 3, 1)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.turma_a = Turma.objects.create(nome='1º A', serie='1ANO', periodo='MATUTINO', ano_letivo=2030)
+        cls.turma_b = Turma.objects.create(nome='1º B', serie='1ANO', periodo='MATUTINO', ano_letivo=2030)
+        # Outro período não recebe alunos desta alocação
+        cls.turma_tarde = Turma.objects.create(nome='1º C', serie='1ANO', periodo='VESPERTINO', ano_letivo=2030)
+
+        cls.elegiveis = criar_alunos(65, date(2023, 5, 10), 'elegivel')
+        criar_alunos(2, date(2020, 1, 1), 'velho')
+        criar_alunos(1, date(2023, 5, 10), 'inativo', ativos=False)
+        matriculados = criar_alunos(10, date(2023, 5, 10), 'matriculado')
+        Matricula.objects.bulk_create([Matricula(aluno=aluno, turma=cls.turma_b) for aluno in matriculados])
+        recontar_alunos()
+
+    def test_preenche_ate_a_capacidade(self):
+        alocados = alocar_automaticamente(self.turma_a, referencia=self.referencia)
+
+        self.assertEqual(alocados, {self.turma_a.pk: 30, self.turma_b.pk: 20})
+        totais = dict(Turma.objects.values_list('pk', 'total_alunos'))
+        self.assertEqual(
+            (totais[self.turma_a.pk], totais[self.turma_b.pk], totais[self.turma_tarde.pk]), (30, 30, 0)
+        )
+        # Fora da faixa etária, inativos e já matriculados ficam de fora; entre
+        # os elegíveis, entram os 50 primeiros em ordem alfabética
+        self.assertEqual(Matricula.objects.filter(aluno__in=self.elegiveis).count(), 50)
+        self.assertEqual(Matricula.objects.count(), 60)
+        self.assertFalse(Matricula.objects.filter(aluno__papel__pessoa__nome='Elegivel 050').exists())
+
+    def test_turmas_cheias(self):
+        alocar_automaticamente(self.turma_a, referencia=self.referencia)
+        self.assertEqual(alocar_automaticamente(self.turma_a, referencia=self.referencia), {})
+
+
+class ResumoFrequenciaTests(TestCase):
+    """resumo_frequencia: totais por turma e por mês, do mês mais recente ao mais antigo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.turma = Turma.objects.create(nome='1º A', serie='1ANO', periodo='MATUTINO', ano_letivo=2030)
+        cls.sem_aulas = Turma.objects.create(nome='1º B', serie='1ANO', periodo='MATUTINO', ano_letivo=2030)
+        cls.aluno, cls.colega = criar_alunos(2, date(2023, 5, 10))
+        presencas = [
+            (date(2030, 2, 3), True), (date(2030, 2, 4), False), (date(2030, 2, 5), True),
+            (date(2030, 3, 2), True), (date(2030, 3, 3), False),
+        ]
+        Chamada.objects.bulk_create(
+            [Chamada(turma=cls.turma, aluno=cls.aluno, data=dia, presente=presente) for dia, presente in presencas]
+            + [Chamada(turma=cls.turma, aluno=cls.colega, data=date(2030, 2, 3), presente=False)]
+        )
+
+    def test_numeros(self):
+        resumos = resumo_frequencia(self.aluno, [self.turma.pk, self.sem_aulas.pk])
+        resumo = resumos[self.turma.pk]
+
+        self.assertEqual(
+            (resumo['total_aulas'], resumo['total_presente'], resumo['total_faltas'], resumo['percentual_presenca']),
+            (5, 3, 2, 60.0),
+        )
+        self.assertEqual((resumo['primeira_aula'], resumo['ultima_aula']), (date(2030, 2, 3), date(2030, 3, 3)))
+        self.assertEqual(
+            [(mes['mes_ano'], mes['total_aulas'], mes['presentes'], mes['faltas']) for mes in resumo['frequencia_mensal']],
+            [('03/2030', 2, 1, 1), ('02/2030', 3, 2, 1)],
+        )
+        self.assertAlmostEqual(resumo['frequencia_mensal'][1]['percentual'], 200 / 3)
+
+        vazio = resumos[self.sem_aulas.pk]
+        self.assertEqual((vazio['total_aulas'], vazio['percentual_presenca'], vazio['frequencia_mensal']), (0, 0, []))
+
+
+class SalvarNotasTests(TestCase):
+    """salvar_notas: grava o que é válido e relata cada célula rejeitada"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.turma = Turma.objects.create(nome='1º A', serie='1ANO', periodo='MATUTINO', ano_letivo=2030)
+        cls.matematica = Disciplina.objects.create(nome='MAT')
+        cls.historia = Disciplina.objects.create(nome='HIS')
+        cls.aluno, cls.outro = criar_alunos(2, date(2023, 5, 10))
+        Nota.objects.create(aluno=cls.outro, disciplina=cls.matematica, turma=cls.turma, bimestre=1, nota=5)
+
+    def test_relatorio(self):
+        aluno, outro, mat, his = self.aluno.pk, self.outro.pk, self.matematica.pk, self.historia.pk
+        dados = {
+            f'nota_{aluno}_{mat}_0': '7,5',
+            f'nota_{aluno}_{mat}_1': '11',
+            f'nota_{aluno}_{mat}_2': 'abc',
+            f'nota_{aluno}_{his}_0': '8',
+            f'nota_{aluno}_{mat}_4': '8',
+            f'nota_999999_{mat}_0': '8',
+            'nota_x': '8',
+            f'nota_{outro}_{mat}_0': '',
+            'csrfmiddlewaretoken': 'ignorado',
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            relatorio = salvar_notas(self.turma, dados, [aluno, outro], [mat])
+
+        self.assertEqual((relatorio['gravadas'], relatorio['removidas']), (1, 1))
+        self.assertEqual(
+            sorted((rejeitada['campo'], rejeitada['erro']) for rejeitada in relatorio['rejeitadas']),
+            sorted([
+                (f'nota_{aluno}_{mat}_1', 'a nota deve estar entre 0 e 10'),
+                (f'nota_{aluno}_{mat}_2', 'valor não numérico'),
+                (f'nota_{aluno}_{his}_0', 'disciplina não atribuída ao professor'),
+                (f'nota_{aluno}_{mat}_4', 'bimestre inválido'),
+                (f'nota_999999_{mat}_0', 'aluno sem matrícula ativa na turma'),
+                ('nota_x', 'campo inválido'),
+            ]),
+        )
+        self.assertEqual(
+            list(Nota.objects.values_list('aluno', 'bimestre', 'nota')), [(aluno, 1, Decimal('7.50'))]
+        )
+        self.assertEqual(
+            list(Boletim.objects.values_list('aluno', 'nota_1', 'media')), [(aluno, Decimal('7.50'), Decimal('7.50'))]
+        )
@@ -28,6 +28,7 @@ urlpatterns = [
     path('minha_frequencia/', views.minha_frequencia, name='minha_frequencia'),
     
     path('professores/', views.listar_professores, name='listar_professores'),
+    path('notas/exportar/', views.exportar_notas, name='exportar_notas'),
     path('professor/minhas-turmas/', views.minhas_turmas_professor, name='minhas_turmas_professor'),
     path('professor/turmas/<int:pk>/', views.detalhar_turma_professor, name='detalhar_turma_professor'),
     path('professor/turmas/<int:turma_pk>/alunos/', views.alunos_turma_professor, name='alunos_turma_professor'),
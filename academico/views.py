@@ -1,30 +1,47 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Count, Q
-from django.core.paginator import Paginator
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Q
 from django.utils import timezone
-from .models import Chamada, Nota, Turma, Disciplina, Matricula
-from .forms import TurmaForm, DisciplinaForm, AlunoEditForm
-from pessoas.models import AlunoInfo, Papel, ProfessorInfo, Pessoa
+from django.utils.text import slugify
+from .models import Boletim, Chamada, Turma, Disciplina, Matricula
+from .exportacao import linhas_csv, resposta_csv
+from .forms import TurmaForm, DisciplinaForm, AlunoEditForm, ExportarNotasForm
+from .estatisticas import obter_estatisticas
+from .paginacao import paginar_por_cursor
+from .services import alocar_automaticamente, matricular_alunos, abrir_chamada, registrar_chamada, resumo_frequencia, salvar_notas, matriz_notas
+from pessoas.busca import buscar_alunos
+from pessoas.models import AlunoInfo, ProfessorInfo
+from contas.perfil import obter_perfil
+from POA.concorrencia import executar_concorrentes
 
 @login_required
-def dashboard_academico(request):
-    turmas_recentes = Turma.objects.filter(ativa=True).order_by('-data_criacao')[:5]
+async def dashboard_academico(request):
+    turmas_recentes, estatisticas = await executar_concorrentes(
+        lambda: list(Turma.objects.filter(ativa=True).order_by('-data_criacao')[:5]),
+        obter_estatisticas,
+    )
     
     context = {
-        'total_turmas': Turma.objects.filter(ativa=True).count(),
-        'total_disciplinas': Disciplina.objects.filter(ativa=True).count(),
-        'total_alunos': AlunoInfo.objects.filter(papel__ativo=True).count(),
-        'total_professores': ProfessorInfo.objects.filter(papel__ativo=True).count(),
+        'total_turmas': estatisticas['total_turmas'],
+        'total_disciplinas': estatisticas['total_disciplinas'],
+        'total_alunos': estatisticas['total_alunos'],
+        'total_professores': estatisticas['total_professores'],
         'turmas_recentes': turmas_recentes,
     }
-    return render(request, 'academico/dashboard.html', context)
+    return await sync_to_async(render)(request, 'academico/dashboard.html', context)
 
 @login_required
 def listar_turmas(request):
-    turmas = Turma.objects.filter(ativa=True).select_related('professor')
-    context = {'turmas': turmas}
+    turmas = Turma.objects.filter(ativa=True).select_related('professor__papel__pessoa')
+    page_obj = paginar_por_cursor(turmas, request.GET.get('cursor'))
+    # A página não tem COUNT; o total vem do retrato dos contadores do dashboard
+    context = {
+        'turmas': page_obj,
+        'page_obj': page_obj,
+        'total_turmas': obter_estatisticas()['total_turmas'],
+    }
     return render(request, 'academico/turmas/listar.html', context)
 
 @login_required
@@ -48,12 +65,14 @@ def criar_turma(request):
 
 @login_required
 def detalhar_turma(request, pk):
-    turma = get_object_or_404(Turma, pk=pk)
-    matriculas = turma.matriculas.filter(ativa=True).select_related('aluno')
-    is_coordenador = (
-    hasattr(request.user, "pessoa") and
-    request.user.pessoa.papeis.filter(tipo=Papel.COORDENADOR).exists()
-)
+    turma = get_object_or_404(
+        Turma.objects.select_related('professor__papel__pessoa').prefetch_related(
+            Prefetch('disciplinas', queryset=Disciplina.objects.select_related('professor__papel__pessoa'))
+        ),
+        pk=pk
+    )
+    matriculas = turma.matriculas.filter(ativa=True).select_related('aluno__papel__pessoa')
+    is_coordenador = obter_perfil(request).is_coordenador
     context = {
         'turma': turma,
         'matriculas': matriculas,
@@ -98,7 +117,7 @@ def excluir_turma(request, pk):
 
 @login_required
 def listar_disciplinas(request):
-    disciplinas = Disciplina.objects.filter(ativa=True).select_related('professor')
+    disciplinas = Disciplina.objects.filter(ativa=True).select_related('professor__papel__pessoa')
     context = {'disciplinas': disciplinas}
     return render(request, 'academico/disciplinas/listar.html', context)
 
@@ -164,8 +183,8 @@ def listar_alunos(request):
     ).select_related(
         'papel__pessoa'
     ).prefetch_related(
-        'turmas'
-    ).order_by('papel__pessoa__nome')
+        Prefetch('turmas', queryset=Turma.objects.only('id', 'nome', 'ativa'), to_attr='lista_turmas')
+    )
     
     # Filtros
     search_query = request.GET.get('search', '')
@@ -173,11 +192,7 @@ def listar_alunos(request):
     turma_filter = request.GET.get('turma', '')
     
     if search_query:
-        alunos_list = alunos_list.filter(
-            Q(papel__pessoa__nome__icontains=search_query) |
-            Q(matricula__icontains=search_query) |
-            Q(papel__pessoa__email__icontains=search_query)
-        )
+        alunos_list = buscar_alunos(alunos_list, search_query)
     
     if status_filter:
         if status_filter == 'ativo':
@@ -188,45 +203,45 @@ def listar_alunos(request):
     if turma_filter:
         alunos_list = alunos_list.filter(turmas__id=turma_filter)
     
-    # Paginação
-    paginator = Paginator(alunos_list, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Estatísticas
-    total_alunos = AlunoInfo.objects.count()
-    alunos_ativos = AlunoInfo.objects.filter(papel__ativo=True).count()
-    alunos_inativos = AlunoInfo.objects.filter(papel__ativo=False).count()
+    # Paginação por chave (nome, id): custo constante em qualquer página
+    # Com busca, os mais parecidos com o termo vêm primeiro
+    page_obj = paginar_por_cursor(
+        alunos_list,
+        request.GET.get('cursor'),
+        'papel__pessoa__nome',
+        relevancia=F('relevancia') if search_query else None,
+    )
     
-    # Alunos sem turma
-    alunos_sem_turma = AlunoInfo.objects.annotate(
-        num_turmas=Count('turmas')
-    ).filter(num_turmas=0, papel__ativo=True).count()
+    # Estatísticas em uma única consulta
+    estatisticas = AlunoInfo.objects.annotate(
+        tem_turma=Exists(Matricula.objects.filter(aluno=OuterRef('pk')))
+    ).aggregate(
+        total_alunos=Count('pk'),
+        alunos_ativos=Count('pk', filter=Q(papel__ativo=True)),
+        alunos_inativos=Count('pk', filter=Q(papel__ativo=False)),
+        alunos_sem_turma=Count('pk', filter=Q(papel__ativo=True, tem_turma=False)),
+    )
     
     # Todas as turmas para o filtro
     turmas = Turma.objects.filter(ativa=True)
     
     # Adicionar dados extras para cada aluno
+    today = timezone.now().date()
     for aluno in page_obj:
         # Calcular idade
-        today = timezone.now().date()
         aluno.idade = today.year - aluno.papel.pessoa.data_nascimento.year - (
             (today.month, today.day) < 
             (aluno.papel.pessoa.data_nascimento.month, aluno.papel.pessoa.data_nascimento.day)
         )
         
-        # IDs das turmas para filtro JavaScript
-        aluno.turmas_ids = list(aluno.turmas.values_list('id', flat=True))
-        aluno.turmas_ativas = aluno.turmas.filter(ativa=True)
+        # IDs das turmas para filtro JavaScript (a partir do prefetch, sem novas consultas)
+        aluno.turmas_ids = [turma.id for turma in aluno.lista_turmas]
+        aluno.turmas_ativas = [turma for turma in aluno.lista_turmas if turma.ativa]
     
     context = {
         'alunos': page_obj,
         'page_obj': page_obj,
-        'is_paginated': page_obj.has_other_pages(),
-        'total_alunos': total_alunos,
-        'alunos_ativos': alunos_ativos,
-        'alunos_inativos': alunos_inativos,
-        'alunos_sem_turma': alunos_sem_turma,
+        **estatisticas,
         'turmas': turmas,
     }
     return render(request, 'academico/alunos/listar.html', context)
@@ -257,7 +272,7 @@ def editar_aluno(request, pk):
     aluno = get_object_or_404(AlunoInfo, pk=pk)
     
     if request.method == 'POST':
-        form = AlunoEditForm(request.POST)
+        form = AlunoEditForm(request.POST, aluno=aluno)
         if form.is_valid():
             # Atualiza apenas a matrícula manualmente
             aluno.matricula = form.cleaned_data['matricula']
@@ -268,7 +283,7 @@ def editar_aluno(request, pk):
             messages.error(request, 'Por favor, corrija os erros no formulário.')
     else:
         # Preenche o form com os dados atuais
-        form = AlunoEditForm(initial={'matricula': aluno.matricula})
+        form = AlunoEditForm(initial={'matricula': aluno.matricula}, aluno=aluno)
     
     context = {
         'form': form,
@@ -293,18 +308,35 @@ def toggle_aluno_status(request, pk):
 @login_required
 def listar_professores(request):
     professores = ProfessorInfo.objects.filter(papel__ativo=True).select_related('papel__pessoa')
+    page_obj = paginar_por_cursor(professores, request.GET.get('cursor'), 'papel__pessoa__nome')
     
     # Calcular idade para cada professor
     today = timezone.now().date()
-    for professor in professores:
+    for professor in page_obj:
         professor.idade = today.year - professor.papel.pessoa.data_nascimento.year - (
             (today.month, today.day) < 
             (professor.papel.pessoa.data_nascimento.month, professor.papel.pessoa.data_nascimento.day)
         )
     
-    context = {'professores': professores}
+    context = {'professores': page_obj, 'page_obj': page_obj}
     return render(request, 'academico/professores/listar.html', context)
 
+@login_required
+def exportar_notas(request):
+    if not (request.user.is_superuser or obter_perfil(request, confirmado=True).is_coordenador):
+        messages.error(request, 'Apenas coordenadores podem exportar notas.')
+        return redirect('dashboard')
+
+    form = ExportarNotasForm(request.GET or None, initial={'ano_letivo': timezone.now().year})
+    if form.is_valid():
+        filtros = form.cleaned_data
+        turma = filtros['turma']
+        recorte = turma.nome if turma else filtros['ano_letivo']
+        nome_arquivo = slugify(f"notas {recorte} {filtros['disciplina'] or ''} {filtros['bimestre'] or ''}") + '.csv'
+        return resposta_csv(request, linhas_csv(**filtros), nome_arquivo)
+
+    return render(request, 'academico/notas/exportar.html', {'form': form})
+
 @login_required
 def gerenciar_alunos_turma(request, pk):
     """Gerenciar alunos em uma turma específica"""
@@ -312,7 +344,8 @@ def gerenciar_alunos_turma(request, pk):
     
     # Alunos já matriculados na turma (ativos)
     alunos_na_turma = AlunoInfo.objects.filter(
-        turmas=turma,
+        matriculas__turma=turma,
+        matriculas__ativa=True,
         papel__ativo=True
     ).select_related('papel__pessoa')
     
@@ -320,52 +353,34 @@ def gerenciar_alunos_turma(request, pk):
     alunos_disponiveis = AlunoInfo.objects.filter(
         papel__ativo=True
     ).exclude(
-        turmas=turma
+        Exists(Matricula.objects.filter(aluno=OuterRef('pk'), turma=turma, ativa=True))
     ).select_related('papel__pessoa').order_by('papel__pessoa__nome')
     
     # Adicionar aluno à turma manualmente
     if request.method == 'POST' and 'adicionar_aluno' in request.POST:
         aluno_id = request.POST.get('aluno_id')
         if aluno_id:
-            try:
-                aluno = AlunoInfo.objects.get(pk=aluno_id, papel__ativo=True)
-                if not turma.alunos.filter(pk=aluno.pk).exists():
-                    Matricula.objects.create(
-                        aluno=aluno,
-                        turma=turma,
-                        situacao='ATIVA',
-                        ativa=True
-                    )
-                    messages.success(request, f'Aluno {aluno.papel.pessoa.nome} adicionado à turma!')
-                else:
-                    messages.warning(request, 'Aluno já está na turma.')
-            except AlunoInfo.DoesNotExist:
+            resultado = matricular_alunos(turma, [aluno_id])
+            nome = next(iter(resultado['nomes'].values()), '')
+            if resultado['adicionados'] or resultado['reativados']:
+                messages.success(request, f'Aluno {nome} adicionado à turma!')
+            elif resultado['ignorados']:
+                messages.warning(request, 'Aluno já está na turma.')
+            else:
                 messages.error(request, 'Aluno não encontrado.')
         return redirect('academico:gerenciar_alunos_turma', pk=pk)
     
-    # Adição automática baseada na idade
+    # Adição automática baseada na idade, distribuída entre as turmas da série
     if request.method == 'POST' and 'adicionar_automaticamente' in request.POST:
-        # Defina aqui o intervalo de idade por série
-        idade_minima, idade_maxima = {
-            '1': (6, 7),
-            '2': (7, 8),
-            '3': (8, 9),
-            # Adicione mais séries conforme necessidade
-        }.get(str(turma.serie), (0, 100))
+        alocados = alocar_automaticamente(turma)
         
-        adicionados = 0
-        for aluno in alunos_disponiveis:
-            if idade_minima <= aluno.papel.pessoa.idade <= idade_maxima:
-                Matricula.objects.create(
-                    aluno=aluno,
-                    turma=turma,
-                    situacao='ATIVA',
-                    ativa=True
-                )
-                adicionados += 1
-
+        adicionados = sum(alocados.values())
         if adicionados > 0:
-            messages.success(request, f'{adicionados} aluno(s) automaticamente matriculado(s) na turma!')
+            messages.success(
+                request,
+                f'{adicionados} aluno(s) automaticamente matriculado(s) em {len(alocados)} turma(s) '
+                f'do {turma.get_serie_display()} ({alocados.get(turma.pk, 0)} nesta turma)!'
+            )
         else:
             messages.info(request, 'Nenhum aluno apropriado para a série foi encontrado.')
         return redirect('academico:gerenciar_alunos_turma', pk=pk)
@@ -409,28 +424,20 @@ def adicionar_alunos_em_lote(request, pk):
     turma = get_object_or_404(Turma, pk=pk)
     
     if request.method == 'POST':
-        aluno_ids = request.POST.getlist('alunos_selecionados')
-        alunos_adicionados = 0
-        
-        for aluno_id in aluno_ids:
-            try:
-                aluno = AlunoInfo.objects.get(pk=aluno_id, papel__ativo=True)
-                # Verificar se já não está matriculado
-                if not turma.alunos.filter(pk=aluno.pk).exists():
-                    Matricula.objects.create(
-                        aluno=aluno,
-                        turma=turma,
-                        situacao='ATIVA',
-                        ativa=True
-                    )
-                    alunos_adicionados += 1
-            except AlunoInfo.DoesNotExist:
-                continue
+        resultado = matricular_alunos(turma, request.POST.getlist('alunos_selecionados'))
+        alunos_adicionados = resultado['adicionados'] + resultado['reativados']
         
         if alunos_adicionados > 0:
-            messages.success(request, f'{alunos_adicionados} aluno(s) adicionado(s) à turma!')
+            detalhes = f" ({resultado['reativados']} reativado(s))" if resultado['reativados'] else ''
+            messages.success(request, f'{alunos_adicionados} aluno(s) adicionado(s) à turma{detalhes}!')
         else:
             messages.warning(request, 'Nenhum aluno foi adicionado.')
+        if resultado['ignorados'] or resultado['invalidos']:
+            messages.info(
+                request,
+                f"{resultado['ignorados']} aluno(s) já estavam na turma; "
+                f"{resultado['invalidos']} não encontrado(s) ou inativo(s)."
+            )
         
         return redirect('academico:gerenciar_alunos_turma', pk=pk)
     
@@ -438,7 +445,7 @@ def adicionar_alunos_em_lote(request, pk):
     alunos_disponiveis = AlunoInfo.objects.filter(
         papel__ativo=True
     ).exclude(
-        turmas=turma
+        Exists(Matricula.objects.filter(aluno=OuterRef('pk'), turma=turma, ativa=True))
     ).select_related('papel__pessoa').order_by('papel__pessoa__nome')
     
     context = {
@@ -487,6 +494,8 @@ def detalhar_turma_professor(request, pk):
         pk=pk,
         ativa=True,
         disciplinas__professor=professor_info
+    ).select_related('professor__papel__pessoa').prefetch_related(
+        Prefetch('disciplinas', queryset=Disciplina.objects.select_related('professor__papel__pessoa'))
     ).distinct().first()
 
     if not turma:
@@ -574,31 +583,25 @@ def chamada(request, turma_id):
 
     data_hoje = timezone.now().date()
 
-    matriculas = Matricula.objects.filter(
-        turma=turma,
-        ativa=True
-    ).select_related('aluno__papel__pessoa').order_by('aluno__papel__pessoa__nome')
+    if request.method == "POST":
+        # Checkboxes marcados chegam como presente_<id da chamada>=on
+        presentes_ids = []
+        for key, value in request.POST.items():
+            chamada_id = key.removeprefix('presente_')
+            if key.startswith('presente_') and chamada_id.isdigit() and value == "on":
+                presentes_ids.append(int(chamada_id))
+        registrar_chamada(turma, data_hoje, presentes_ids)
+        messages.success(request, "Chamada registrada com sucesso!")
+        return redirect('academico:fazer_chamada_professor', turma_id=turma.id)
 
     # Cria registros de chamada do dia se não existirem
-    for matricula in matriculas:
-        Chamada.objects.get_or_create(
-            turma=turma,
-            aluno=matricula.aluno,
-            data=data_hoje
-        )
+    abrir_chamada(turma, data_hoje)
 
     chamadas = Chamada.objects.filter(
         turma=turma,
         data=data_hoje
     ).select_related('aluno__papel__pessoa').order_by('aluno__papel__pessoa__nome')
 
-    if request.method == "POST":
-        for chamada_obj in chamadas:
-            chamada_obj.presente = request.POST.get(f"presente_{chamada_obj.id}") == "on"
-            chamada_obj.save()
-        messages.success(request, "Chamada registrada com sucesso!")
-        return redirect('academico:fazer_chamada_professor', turma_id=turma.id)
-
     return render(request, 'academico/professores/chamada.html', {
         'turma': turma,
         'chamadas': chamadas,
@@ -624,46 +627,34 @@ def diario_professor(request):
         disciplinas = turma.disciplinas.filter(professor=professor, ativa=True)
 
         if request.method == 'POST':
-            for key, value in request.POST.items():
-                if key.startswith('nota_'):
-                    try:
-                        _, aluno_id, disciplina_id, bimestre_index = key.split('_')
-                        bimestre = int(bimestre_index) + 1
-                        if value.strip():
-                            nota_val = float(value.replace(',', '.'))
-                            Nota.objects.update_or_create(
-                                aluno_id=aluno_id,
-                                disciplina_id=disciplina_id,
-                                turma=turma,
-                                bimestre=bimestre,
-                                defaults={'nota': nota_val}
-                            )
-                        else:
-                            Nota.objects.filter(
-                                aluno_id=aluno_id,
-                                disciplina_id=disciplina_id,
-                                turma=turma,
-                                bimestre=bimestre
-                            ).delete()
-                    except Exception:
-                        continue
-            messages.success(request, "Notas salvas com sucesso!")
+            relatorio = salvar_notas(
+                turma,
+                request.POST,
+                alunos.values_list('aluno_id', flat=True),
+                disciplinas.values_list('id', flat=True)
+            )
+            if relatorio['rejeitadas']:
+                messages.warning(
+                    request,
+                    f"{len(relatorio['rejeitadas'])} nota(s) não foram salvas: " + "; ".join(
+                        f"{item['campo']} ({item['erro']})" for item in relatorio['rejeitadas'][:5]
+                    )
+                )
+            else:
+                messages.success(request, "Notas salvas com sucesso!")
             return redirect(f'{request.path}?turma={turma_id}')
 
         # Monta dados para template
+        disciplinas = list(disciplinas)
+        notas = matriz_notas(turma, professor)
         for matricula in alunos:
             aluno = matricula.aluno
             disciplinas_data = []
             for disciplina in disciplinas:
-                notas_qs = Nota.objects.filter(aluno=aluno, disciplina=disciplina, turma=turma).order_by('bimestre')
-                notas_lista = [''] * 4
-                for nota_obj in notas_qs:
-                    idx = nota_obj.bimestre - 1
-                    if 0 <= idx < 4:
-                        notas_lista[idx] = format(nota_obj.nota, '.1f') if nota_obj.nota is not None else ''
+                notas_lista = notas.get((aluno.id, disciplina.id), [None] * 4)
                 disciplinas_data.append({
                     'disciplina': disciplina,
-                    'notas': notas_lista
+                    'notas': [format(nota, '.1f') if nota is not None else '' for nota in notas_lista]
                 })
             alunos_data.append({
                 'aluno': aluno,
@@ -686,29 +677,27 @@ def meu_boletim(request):
     except AlunoInfo.DoesNotExist:
         return render(request, "academico/erro.html", {"mensagem": "Você não possui perfil de aluno."})
     
-    turmas = aluno.turmas.filter(ativa=True)
-    boletim = []
+    turmas = aluno.turmas.filter(ativa=True).select_related(
+        'professor__papel__pessoa'
+    ).prefetch_related('disciplinas')
 
+    # Notas e médias já consolidadas, uma linha por turma/disciplina
+    linhas = {
+        (linha.turma_id, linha.disciplina_id): linha
+        for linha in Boletim.objects.filter(aluno=aluno)
+    }
+
+    boletim = []
     for turma in turmas:
         professor_nome = turma.professor.papel.pessoa.nome if turma.professor else "Não atribuído"
-        disciplinas = turma.disciplinas.all()
         notas_disciplinas = []
 
-        for disciplina in disciplinas:
-            notas_obj = Nota.objects.filter(aluno=aluno, turma=turma, disciplina=disciplina).order_by('bimestre')
-            notas = [n.nota for n in notas_obj]
-            notas_completas = [notas[i] if i < len(notas) else None for i in range(4)]
-
-            notas_validas = [n for n in notas_completas if n is not None]
-            if notas_validas:
-                media = round(sum(notas_validas) / len(notas_validas), 2)
-            else:
-                media = None
-
+        for disciplina in turma.disciplinas.all():
+            linha = linhas.get((turma.id, disciplina.id))
             notas_disciplinas.append({
                 "disciplina": disciplina.get_nome_display(),
-                "notas": notas_completas,
-                "media": media
+                "notas": linha.notas if linha else [None] * 4,
+                "media": linha.media if linha else None
             })
 
         boletim.append({
@@ -736,72 +725,13 @@ def minha_frequencia(request):
     # Buscar todas as matrículas ativas do aluno
     matriculas = Matricula.objects.filter(aluno=aluno, ativa=True).select_related('turma')
     
-    # Estrutura para armazenar dados de frequência por turma
-    frequencias_data = []
-    
-    for matricula in matriculas:
-        turma = matricula.turma
-        
-        # Buscar todas as chamadas do aluno nesta turma
-        chamadas = Chamada.objects.filter(
-            aluno=aluno,
-            turma=turma
-        ).order_by('data')
-        
-        # Calcular estatísticas
-        total_aulas = chamadas.count()
-        total_presente = chamadas.filter(presente=True).count()
-        total_faltas = chamadas.filter(presente=False).count()
-        
-        if total_aulas > 0:
-            percentual_presenca = (total_presente / total_aulas) * 100
-        else:
-            percentual_presenca = 0
-        
-        # Agrupar por mês/ano
-        frequencia_mensal = []
-        for chamada in chamadas:
-            mes_ano = f"{chamada.data.month:02d}/{chamada.data.year}"
-            
-            # Verificar se já existe esse mês na lista
-            encontrado = False
-            for item in frequencia_mensal:
-                if item['mes_ano'] == mes_ano:
-                    item['total_aulas'] += 1
-                    if chamada.presente:
-                        item['presentes'] += 1
-                    else:
-                        item['faltas'] += 1
-                    encontrado = True
-                    break
-            
-            if not encontrado:
-                frequencia_mensal.append({
-                    'mes_ano': mes_ano,
-                    'mes': chamada.data.month,
-                    'ano': chamada.data.year,
-                    'total_aulas': 1,
-                    'presentes': 1 if chamada.presente else 0,
-                    'faltas': 0 if chamada.presente else 1,
-                })
-        
-        # Calcular percentual para cada mês
-        for item in frequencia_mensal:
-            if item['total_aulas'] > 0:
-                item['percentual'] = (item['presentes'] / item['total_aulas']) * 100
-            else:
-                item['percentual'] = 0
-        
-        frequencias_data.append({
-            'turma': turma,
-            'total_aulas': total_aulas,
-            'total_presente': total_presente,
-            'total_faltas': total_faltas,
-            'percentual_presenca': percentual_presenca,
-            'frequencia_mensal': sorted(frequencia_mensal, key=lambda x: (x['ano'], x['mes']), reverse=True),
-            'primeira_aula': chamadas.first().data if chamadas.exists() else None,
-            'ultima_aula': chamadas.last().data if chamadas.exists() else None,
-        })
+    # Totais por turma e por mês calculados no banco
+    resumos = resumo_frequencia(aluno, [matricula.turma_id for matricula in matriculas])
+
+    frequencias_data = [
+        {'turma': matricula.turma, **resumos[matricula.turma_id]}
+        for matricula in matriculas
+    ]
     
     return render(request, 'academico/alunos/frequencia.html', {
         'aluno': aluno,
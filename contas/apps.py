@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class ContasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'contas'
\ No newline at end of file
+    name = 'contas'
+
+    def ready(self):
+        from . import signals  # noqa: F401
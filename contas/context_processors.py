@@ -1,17 +1,13 @@
-from pessoas.models import Pessoa, Papel
+from contas.perfil import obter_perfil, versao_perfil
 
 def perfil_usuario(request):
     if not request.user.is_authenticated:
         return {}
 
-    try:
-        pessoa = Pessoa.objects.get(user=request.user)
-    except Pessoa.DoesNotExist:
-        return {}
-
-    papel = pessoa.papeis.filter(ativo=True).first()
+    # Chave dos fragmentos do layout que dependem do usuário
+    contexto = {"versao_perfil": versao_perfil(request.user.pk)}
 
-    return {
-        "pessoa_logada": pessoa,
-        "papel_logado": papel,
-    }
+    perfil = obter_perfil(request)
+    if perfil:
+        contexto["perfil_logado"] = perfil
+    return contexto
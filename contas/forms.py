@@ -1,6 +1,9 @@
+import re
+
 from django import forms
 from django.contrib.auth.models import User
 from pessoas.models import Pessoa, Papel, AlunoInfo, ProfessorInfo
+from academico.models import Turma
 
 class CriarUsuarioForm(forms.Form):
     # Dados do User
@@ -20,3 +23,47 @@ class CriarUsuarioForm(forms.Form):
     # Campos opcionais específicos
     codigo_funcional = forms.CharField(required=False)
     formacao = forms.CharField(required=False)
+
+
+class ImportarAlunosForm(forms.Form):
+    arquivo = forms.FileField(
+        label="Arquivo CSV",
+        widget=forms.ClearableFileInput(attrs={"class": "form-control", "accept": ".csv"}),
+        help_text=(
+            "Colunas: nome, cpf, data_nascimento, username, senha, email, telefone e turma (opcional). "
+            "A importação continua em segundo plano; o andamento aparece na página seguinte."
+        )
+    )
+    turma = forms.ModelChoiceField(
+        queryset=Turma.objects.filter(ativa=True),
+        required=False,
+        widget=forms.Select(attrs={"class": "form-select"}),
+        label="Matricular na turma",
+        help_text="Usada nas linhas sem a coluna turma preenchida"
+    )
+
+
+def normalizar_cpf(valor):
+    """CPF no formato 000.000.000-00, gravado pela importação e pelo gerador; None sem 11 dígitos"""
+    digitos = re.sub(r'\D', '', valor or '')
+    if len(digitos) != 11:
+        return None
+    return f"{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}"
+
+
+class LinhaImportacaoAlunoForm(forms.Form):
+    """Validação de uma linha do CSV de importação de alunos"""
+    nome = forms.CharField(max_length=100)
+    cpf = forms.CharField(max_length=14)
+    data_nascimento = forms.DateField()
+    username = forms.CharField(max_length=150)
+    senha = forms.CharField()
+    email = forms.EmailField(required=False)
+    telefone = forms.CharField(max_length=15, required=False)
+    turma = forms.IntegerField(required=False)
+
+    def clean_cpf(self):
+        cpf = normalizar_cpf(self.cleaned_data['cpf'])
+        if cpf is None:
+            raise forms.ValidationError('informe os 11 dígitos do CPF.')
+        return cpf
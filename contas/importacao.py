@@ -0,0 +1,267 @@
+import codecs
+import csv
+import os
+import tempfile
+import uuid
+from itertools import chain, islice
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from academico.estatisticas import invalidar_estatisticas
+from academico.models import Matricula, Turma
+from academico.services import recontar_alunos
+from contas.forms import LinhaImportacaoAlunoForm, normalizar_cpf
+from contas.senhas import gerar_hashes
+from pessoas.models import Pessoa, Papel, AlunoInfo, SequenciaMatricula
+from POA.concorrencia import executar_em_segundo_plano
+
+TAMANHO_LOTE = 500
+# Pela tela cada senha ainda custa meio segundo de PBKDF2: lotes menores
+# deixam o andamento mais frequente
+TAMANHO_LOTE_WEB = 50
+
+CHAVE_SITUACAO = 'importacao_alunos:{}'
+RETENCAO_SITUACAO_SEGUNDOS = 24 * 60 * 60
+
+
+class ArquivoInvalido(ValueError):
+    """Problema no arquivo como um todo, detectado antes de gravar qualquer linha"""
+
+
+def _ler_csv(arquivo):
+    """Lê o CSV enviado linha a linha, aceitando ';' (Excel pt-BR) ou ',' como separador"""
+    linhas = codecs.iterdecode(arquivo, 'utf-8-sig')
+    cabecalho = next(linhas, '')
+    delimitador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+    leitor = csv.DictReader(chain([cabecalho], linhas), delimiter=delimitador)
+    for registro in leitor:
+        yield {
+            (chave or '').strip().lower(): (valor or '').strip()
+            for chave, valor in registro.items()
+            if chave is not None
+        }
+
+
+def contar_linhas(arquivo):
+    """
+    Percorre o arquivo inteiro (sem guardá-lo) e devolve a quantidade de
+    linhas de dados. Erros de codificação ou de formato aparecem aqui, antes
+    de qualquer gravação, como ArquivoInvalido.
+    """
+    try:
+        return sum(1 for _ in _ler_csv(arquivo))
+    except UnicodeDecodeError:
+        raise ArquivoInvalido(
+            'O arquivo não está em UTF-8. No Excel, salve como "CSV UTF-8 (delimitado por vírgulas)".'
+        )
+    except csv.Error as erro:
+        raise ArquivoInvalido(f'CSV inválido: {erro}')
+    finally:
+        arquivo.seek(0)
+
+
+def _validar_lote(lote, turma_padrao, vistos):
+    """
+    Valida um lote de linhas: campos via formulário e duplicidades contra o
+    próprio arquivo e contra o banco, com uma consulta por tipo de checagem.
+    Devolve as linhas aprovadas como (número, dados) e os erros.
+    """
+    validas = []
+    erros = []
+    for numero, registro in lote:
+        form = LinhaImportacaoAlunoForm(registro)
+        if not form.is_valid():
+            erros.append({
+                'linha': numero,
+                'erros': [f"{campo}: {' '.join(mensagens)}" for campo, mensagens in form.errors.items()],
+            })
+            continue
+        dados = form.cleaned_data
+        if dados['turma'] is None and turma_padrao is not None:
+            dados['turma'] = turma_padrao.pk
+        validas.append((numero, dados))
+
+    cpfs = {dados['cpf'] for _, dados in validas}
+    usernames = {dados['username'] for _, dados in validas}
+    turmas = {dados['turma'] for _, dados in validas if dados['turma'] is not None}
+
+    # CPFs cadastrados à mão podem estar só com os dígitos
+    so_digitos = {cpf.replace('.', '').replace('-', '') for cpf in cpfs}
+    cpfs_existentes = {
+        normalizar_cpf(cpf) or cpf
+        for cpf in Pessoa.objects.filter(cpf__in=cpfs | so_digitos).values_list('cpf', flat=True)
+    }
+    usernames_existentes = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    turmas_ativas = set(Turma.objects.filter(pk__in=turmas, ativa=True).values_list('pk', flat=True))
+
+    aprovadas = []
+    for numero, dados in validas:
+        problemas = []
+        if dados['cpf'] in cpfs_existentes:
+            problemas.append('cpf: já cadastrado')
+        elif dados['cpf'] in vistos['cpf']:
+            problemas.append('cpf: repetido no arquivo')
+        if dados['username'] in usernames_existentes:
+            problemas.append('username: já cadastrado')
+        elif dados['username'] in vistos['username']:
+            problemas.append('username: repetido no arquivo')
+        if dados['turma'] is not None and dados['turma'] not in turmas_ativas:
+            problemas.append('turma: não encontrada ou inativa')
+
+        vistos['cpf'].add(dados['cpf'])
+        vistos['username'].add(dados['username'])
+        if problemas:
+            erros.append({'linha': numero, 'erros': problemas})
+        else:
+            aprovadas.append((numero, dados))
+    return aprovadas, erros
+
+
+def _criar_alunos(linhas, hashes, matriculas):
+    """Cria User, Pessoa, Papel, AlunoInfo e Matricula das linhas com INSERTs em lote"""
+    with transaction.atomic():
+        users = User.objects.bulk_create([
+            User(username=dados['username'], password=senha, email=dados['email'])
+            for dados, senha in zip(linhas, hashes)
+        ])
+        pessoas = Pessoa.objects.bulk_create([
+            Pessoa(
+                user=user,
+                nome=dados['nome'],
+                cpf=dados['cpf'],
+                data_nascimento=dados['data_nascimento'],
+                email=dados['email'],
+                telefone=dados['telefone'],
+            )
+            for user, dados in zip(users, linhas)
+        ])
+        papeis = Papel.objects.bulk_create([Papel(pessoa=pessoa, tipo=Papel.ALUNO) for pessoa in pessoas])
+        alunos = AlunoInfo.objects.bulk_create([
+            AlunoInfo(papel=papel, matricula=matricula) for papel, matricula in zip(papeis, matriculas)
+        ])
+
+        novas = [
+            Matricula(aluno=aluno, turma_id=dados['turma'])
+            for aluno, dados in zip(alunos, linhas)
+            if dados['turma'] is not None
+        ]
+        Matricula.objects.bulk_create(novas)
+        recontar_alunos({matricula.turma_id for matricula in novas})
+    return len(novas)
+
+
+def _gravar_lote(aprovadas, processos, relatorio):
+    """
+    Grava o lote numa transação. Se outro cadastro gravou o mesmo CPF ou
+    username depois da validação, o lote é desfeito e gravado linha a linha
+    para relatar só as linhas em conflito.
+    """
+    linhas = [dados for _, dados in aprovadas]
+    # Hashes e matrículas antes da transação, para não segurar travas durante o cálculo
+    hashes = gerar_hashes([dados['senha'] for dados in linhas], processos)
+    matriculas = SequenciaMatricula.proximas_matriculas(len(linhas))
+    try:
+        relatorio['matriculados'] += _criar_alunos(linhas, hashes, matriculas)
+        relatorio['criados'] += len(linhas)
+        return
+    except IntegrityError:
+        pass
+
+    for (numero, dados), senha, matricula in zip(aprovadas, hashes, matriculas):
+        try:
+            relatorio['matriculados'] += _criar_alunos([dados], [senha], [matricula])
+            relatorio['criados'] += 1
+        except IntegrityError:
+            relatorio['erros'].append({
+                'linha': numero,
+                'erros': ['cpf ou username: cadastrado por outro usuário durante a importação'],
+            })
+
+
+def importar_alunos(arquivo, turma_padrao=None, processos=1, tamanho_lote=TAMANHO_LOTE, log=None):
+    """
+    Importa alunos de um CSV processando-o em lotes, sem carregar o arquivo
+    inteiro. Linhas inválidas são ignoradas e relatadas; as demais são criadas.
+
+    O arquivo é lido uma vez inteiro antes de gravar: problemas de codificação
+    levantam ArquivoInvalido sem que nada tenha sido gravado. Cada lote é
+    gravado na sua transação.
+    """
+    total = contar_linhas(arquivo)
+    relatorio = {'criados': 0, 'matriculados': 0, 'erros': []}
+    vistos = {'cpf': set(), 'username': set()}
+
+    # A linha 1 é o cabeçalho
+    registros = enumerate(_ler_csv(arquivo), start=2)
+    while lote := list(islice(registros, tamanho_lote)):
+        aprovadas, erros = _validar_lote(lote, turma_padrao, vistos)
+        relatorio['erros'].extend(erros)
+        if aprovadas:
+            _gravar_lote(aprovadas, processos, relatorio)
+        if log is not None:
+            log(f"{lote[-1][0] - 1} de {total} linha(s) processadas.")
+    if relatorio['criados']:
+        invalidar_estatisticas()
+    relatorio['erros'].sort(key=lambda erro: erro['linha'])
+    return relatorio
+
+
+def situacao_importacao(identificador):
+    """
+    Andamento de uma importação iniciada pela tela: total de linhas, última
+    mensagem, relatório ao terminar e se falhou. None se não existe ou expirou.
+    """
+    return cache.get(CHAVE_SITUACAO.format(identificador))
+
+
+def _gravar_situacao(identificador, situacao):
+    cache.set(CHAVE_SITUACAO.format(identificador), situacao, RETENCAO_SITUACAO_SEGUNDOS)
+
+
+def _importar_copia(identificador, situacao, caminho, turma_padrao_id):
+    def log(mensagem):
+        situacao['mensagem'] = mensagem
+        _gravar_situacao(identificador, situacao)
+
+    try:
+        turma_padrao = Turma.objects.get(pk=turma_padrao_id) if turma_padrao_id is not None else None
+        with open(caminho, 'rb') as arquivo:
+            situacao['relatorio'] = importar_alunos(arquivo, turma_padrao, tamanho_lote=TAMANHO_LOTE_WEB, log=log)
+    except Exception:
+        situacao['falhou'] = True
+        raise
+    finally:
+        os.remove(caminho)
+        _gravar_situacao(identificador, situacao)
+
+
+def iniciar_importacao(arquivo, turma_padrao=None):
+    """
+    Importação pela tela: confere o arquivo, guarda uma cópia e a importa em
+    segundo plano, já que milhares de senhas levam minutos. Devolve o
+    identificador para acompanhar o andamento em situacao_importacao().
+
+    O andamento fica no cache: com mais de um processo ele precisa ser
+    compartilhado (REDIS_URL) para que qualquer um deles o mostre.
+    """
+    total = contar_linhas(arquivo)
+    # O arquivo enviado é apagado ao final da requisição
+    with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as copia:
+        for bloco in arquivo.chunks():
+            copia.write(bloco)
+
+    identificador = uuid.uuid4().hex
+    situacao = {
+        'total': total,
+        'mensagem': f'0 de {total} linha(s) processadas.',
+        'relatorio': None,
+        'falhou': False,
+    }
+    _gravar_situacao(identificador, situacao)
+    executar_em_segundo_plano(
+        _importar_copia, identificador, situacao, copia.name,
+        turma_padrao.pk if turma_padrao is not None else None,
+    )
+    return identificador
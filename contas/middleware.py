@@ -1,6 +1,58 @@
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
 from django.shortcuts import redirect
-from django.urls import resolve
 from django.contrib import messages
+from django.utils.functional import SimpleLazyObject
+
+from contas.perfil import carregar_perfil
+from POA.consultas import MedicaoConsultas, orcamento_da_rota
+
+logger = logging.getLogger('POA.consultas')
+
+
+class OrcamentoConsultasMiddleware:
+    """
+    Em desenvolvimento, mede as consultas de cada requisição e avisa no log
+    quando a rota passa do orçamento declarado ou repete a mesma consulta
+    """
+
+    def __init__(self, get_response):
+        if not settings.MEDIR_CONSULTAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with MedicaoConsultas() as medicao:
+            response = self.get_response(request)
+
+        resolver = request.resolver_match
+        if resolver is None:
+            return response
+
+        rota = resolver.view_name
+        orcamento = orcamento_da_rota(rota)
+        response['X-Consultas'] = medicao.total
+        if medicao.total > orcamento:
+            logger.warning("%s passou do orçamento de %d: %s", rota, orcamento, medicao.resumo())
+        for sql, vezes in medicao.repetidas.items():
+            logger.warning("%s repetiu %d vezes a consulta (N+1?): %s", rota, vezes, sql)
+        return response
+
+
+class PerfilUsuarioMiddleware:
+    """
+    Anexa request.perfil: pessoa e papéis ativos do usuário, resolvidos só
+    quando usados e reaproveitados da sessão nas requisições seguintes
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.perfil = SimpleLazyObject(lambda: carregar_perfil(request))
+        return self.get_response(request)
 
 class PapelRequiredMiddleware:
     """
@@ -25,6 +77,7 @@ class PapelRequiredMiddleware:
         'academico:criar_sala',
         'academico:listar_alunos',
         'academico:listar_professores',
+        'academico:exportar_notas',
     ]
 
     def __init__(self, get_response):
@@ -39,10 +92,10 @@ class PapelRequiredMiddleware:
             return self.get_response(request)
 
         rota_atual = resolver.url_name
-        pessoa = getattr(request.user, 'pessoa', None)
+        perfil = request.perfil
 
-        if pessoa:
-            papeis = list(pessoa.papeis.values_list("tipo", flat=True))
+        if perfil:
+            papeis = perfil.papeis
 
             # Proteção de rotas específicas
             if rota_atual in self.ROTAS_ALUNO and "ALUNO" not in papeis:
@@ -76,4 +129,12 @@ class LoginRequiredMiddleware:
         if not request.user.is_authenticated:
             return redirect('/login/?next=' + path)
 
+        # O usuário já foi carregado aqui: as views assíncronas (request.auser)
+        # reaproveitam o mesmo objeto em vez de consultá-lo de novo
+        usuario = request.user
+
+        async def auser():
+            return usuario
+
+        request.auser = auser
         return self.get_response(request)
\ No newline at end of file
@@ -0,0 +1,142 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from pessoas.models import Pessoa, Papel
+
+# Chave do perfil guardado na sessão e tempo máximo que ele é reaproveitado
+# sem consultar o banco (limita a defasagem quando o cache não é compartilhado)
+CHAVE_SESSAO = 'perfil_usuario'
+VALIDADE_SEGUNDOS = 300
+
+
+def _chave_versao(user_id):
+    return f'perfil_usuario:versao:{user_id}'
+
+
+class PerfilUsuario:
+    """Identidade e papéis ativos do usuário logado, sem acesso ao banco"""
+
+    def __init__(self, pessoa_id=None, nome=None, papeis=()):
+        self.pessoa_id = pessoa_id
+        self.nome = nome
+        # Tipos dos papéis ativos, na ordem em que foram atribuídos
+        self.papeis = list(papeis)
+
+    def __bool__(self):
+        return self.pessoa_id is not None
+
+    def __str__(self):
+        return self.nome or ''
+
+    @property
+    def tipo_principal(self):
+        return self.papeis[0] if self.papeis else None
+
+    def tem_papel(self, tipo):
+        return tipo in self.papeis
+
+    @property
+    def is_coordenador(self):
+        return self.tem_papel(Papel.COORDENADOR)
+
+    @property
+    def is_professor(self):
+        return self.tem_papel(Papel.PROFESSOR)
+
+    @property
+    def is_aluno(self):
+        return self.tem_papel(Papel.ALUNO)
+
+    def como_dict(self):
+        return {'pessoa_id': self.pessoa_id, 'nome': self.nome, 'papeis': self.papeis}
+
+    @classmethod
+    def do_banco(cls, user):
+        """Carrega pessoa e papéis ativos do usuário em uma única consulta"""
+        linhas = Pessoa.objects.filter(user=user).order_by('papeis__pk').values_list(
+            'pk', 'nome', 'papeis__tipo', 'papeis__ativo'
+        )
+        perfil = cls()
+        for pessoa_id, nome, tipo, ativo in linhas:
+            perfil.pessoa_id, perfil.nome = pessoa_id, nome
+            if ativo and tipo not in perfil.papeis:
+                perfil.papeis.append(tipo)
+        return perfil
+
+
+def versao_perfil(user_id):
+    """Muda sempre que o perfil do usuário é invalidado (compõe chaves de cache)"""
+    return cache.get(_chave_versao(user_id), 0)
+
+
+def invalidar_perfil(user_id):
+    """Força o recarregamento do perfil em todas as sessões do usuário"""
+    if user_id is None:
+        return
+    try:
+        cache.incr(_chave_versao(user_id))
+    except ValueError:
+        cache.set(_chave_versao(user_id), 1, None)
+
+
+def carregar_perfil(request, confirmar=False):
+    """
+    Devolve o perfil do usuário da requisição, reaproveitando o que está na
+    sessão enquanto a versão do usuário não mudar e a validade não expirar.
+    Com confirmar=True o perfil é sempre relido do banco; a sessão só é
+    regravada se ele mudou ou se a validade expirou.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return PerfilUsuario()
+
+    versao = versao_perfil(user.pk)
+    salvo = request.session.get(CHAVE_SESSAO)
+    valido = (
+        salvo
+        and salvo['user_id'] == user.pk
+        and salvo['versao'] == versao
+        and salvo['expira_em'] > time.time()
+    )
+    if valido and not confirmar:
+        return PerfilUsuario(**salvo['perfil'])
+
+    perfil = PerfilUsuario.do_banco(user)
+    if not (valido and salvo['perfil'] == perfil.como_dict()):
+        request.session[CHAVE_SESSAO] = {
+            'user_id': user.pk,
+            'versao': versao,
+            'expira_em': time.time() + VALIDADE_SEGUNDOS,
+            'perfil': perfil.como_dict(),
+        }
+    return perfil
+
+
+def obter_perfil(request, confirmado=False):
+    """
+    Perfil já resolvido pelo middleware ou, na falta dele, carregado agora.
+
+    Decisões de acesso a rotas privilegiadas pedem confirmado=True: a
+    invalidação por versão só alcança os processos que enxergam o mesmo cache,
+    e um papel revogado poderia continuar valendo na sessão por até
+    VALIDADE_SEGUNDOS. O perfil confirmado custa uma consulta e vale para o
+    resto da requisição.
+    """
+    perfil = getattr(request, 'perfil', None)
+    if confirmado and not getattr(request, 'perfil_confirmado', False):
+        perfil = request.perfil = carregar_perfil(request, confirmar=True)
+        request.perfil_confirmado = True
+    elif perfil is None:
+        perfil = request.perfil = carregar_perfil(request)
+    return perfil
+
+
+async def aobter_perfil(request):
+    """obter_perfil() para views assíncronas: o perfil é resolvido numa thread"""
+    def resolver():
+        perfil = obter_perfil(request)
+        bool(perfil)  # resolve o SimpleLazyObject do middleware fora do laço de eventos
+        return perfil
+    return await sync_to_async(resolver)()
@@ -0,0 +1,17 @@
+"""
+Hashes de senha para cadastros em lote. Cada make_password() roda as
+iterações do PBKDF2 (meio segundo ou mais por senha), então só processos
+fora de uma requisição web (comandos de gerenciamento) devem usar o paralelo.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+
+
+def gerar_hashes(senhas, processos=1):
+    """Calcula os hashes em sequência ou, com processos > 1, num pool de processos"""
+    if processos <= 1:
+        return [make_password(senha) for senha in senhas]
+    with ProcessPoolExecutor(max_workers=processos, initializer=django.setup) as pool:
+        return list(pool.map(make_password, senhas, chunksize=64))
@@ -0,0 +1,27 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from contas.perfil import invalidar_perfil
+from pessoas.models import Pessoa, Papel
+
+
+@receiver(post_save, sender=Papel)
+@receiver(post_delete, sender=Papel)
+def invalidar_perfil_do_papel(sender, instance, **kwargs):
+    user_id = Pessoa.objects.filter(pk=instance.pessoa_id).values_list('user_id', flat=True).first()
+    invalidar_perfil(user_id)
+
+
+@receiver(post_save, sender=Pessoa)
+@receiver(post_delete, sender=Pessoa)
+def invalidar_perfil_da_pessoa(sender, instance, **kwargs):
+    invalidar_perfil(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidar_perfil_do_usuario(sender, instance, update_fields=None, **kwargs):
+    # O nome exibido no cabeçalho vem do User; o login só atualiza last_login
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidar_perfil(instance.pk)
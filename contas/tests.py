@@ -1,3 +1,206 @@
-from django.test import TestCase
+import io
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from academico.tests import gerar_escola_de_teste
+from contas.importacao import TAMANHO_LOTE_WEB, ArquivoInvalido, importar_alunos, iniciar_importacao, situacao_importacao
+from contas.senhas import gerar_hashes
+from academico.models import Matricula, Turma
+from pessoas.models import AlunoInfo, Papel, Pessoa, SequenciaMatricula
+from POA.testes import OrcamentoConsultasMixin
+from . import urls
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class OrcamentoConsultasTests(OrcamentoConsultasMixin, TestCase):
+    """Cada rota de contas dentro de settings.ORCAMENTO_CONSULTAS e sem N+1"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.escola = gerar_escola_de_teste()
+
+    def test_rotas_de_contas(self):
+        identificador = iniciar_importacao(SimpleUploadedFile('alunos.csv', CABECALHO_CSV.encode()))
+        self.assertRotasNoOrcamento(urls, self.escola['coordenador'], argumentos={
+            'situacao_importacao': ({'identificador': identificador}, ''),
+        })
+
+    def test_dashboard_de_cada_papel(self):
+        for papel in ('professor', 'aluno'):
+            with self.subTest(papel=papel):
+                self.assertDentroDoOrcamento(self.escola[papel], 'dashboard')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AcessoPorPapelTests(TestCase):
+    """Telas de coordenação conferem o papel no banco, não só o perfil guardado na sessão"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.escola = gerar_escola_de_teste()
+
+    def test_importacao_bloqueia_outros_papeis(self):
+        self.client.force_login(self.escola['professor'])
+        resposta = self.client.get(reverse('importar_alunos'))
+        self.assertRedirects(resposta, reverse('dashboard'), fetch_redirect_response=False)
+
+    def test_papel_revogado_em_outro_processo(self):
+        coordenador = self.escola['coordenador']
+        self.client.force_login(coordenador)
+        self.assertEqual(self.client.get(reverse('importar_alunos')).status_code, 200)
+
+        # update() não emite sinais: a versão do perfil no cache não muda, como
+        # quando a alteração é feita por outro processo com cache próprio
+        Papel.objects.filter(pessoa__user=coordenador, tipo=Papel.COORDENADOR).update(ativo=False)
+
+        resposta = self.client.get(reverse('importar_alunos'))
+        self.assertRedirects(resposta, reverse('dashboard'), fetch_redirect_response=False)
+
+
+CABECALHO_CSV = 'nome;cpf;data_nascimento;username;senha;email;telefone;turma\n'
+
+
+def _csv(*linhas, codificacao='utf-8'):
+    return io.BytesIO((CABECALHO_CSV + ''.join(f'{linha}\n' for linha in linhas)).encode(codificacao))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportacaoAlunosTests(TestCase):
+    """Importação de alunos por CSV: relatório por linha e nada gravado quando o arquivo é inválido"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.escola = gerar_escola_de_teste()
+
+    def test_importacao_com_turmas(self):
+        turma, outra = Turma.objects.filter(ativa=True).order_by('pk')[:2]
+        total_antes = {t.pk: t.total_alunos for t in (turma, outra)}
+        ultimo = SequenciaMatricula.objects.get().ultimo
+
+        relatorio = importar_alunos(_csv(
+            'Ana Import;111.444.777-35;2014-03-02;ana.import;segredo1;ana@escola.br;;',
+            f'Bia Import;529.982.247-25;02/03/2014;bia.import;segredo2;;;{outra.pk}',
+        ), turma_padrao=turma)
+
+        self.assertEqual(relatorio, {'criados': 2, 'matriculados': 2, 'erros': []})
+        ana = AlunoInfo.objects.select_related('papel__pessoa__user').get(papel__pessoa__user__username='ana.import')
+        self.assertTrue(ana.papel.pessoa.user.check_password('segredo1'))
+        self.assertEqual(ana.papel.pessoa.email, 'ana@escola.br')
+        self.assertEqual(
+            sorted(AlunoInfo.objects.filter(papel__pessoa__user__username__endswith='.import').values_list('matricula', flat=True)),
+            [SequenciaMatricula.formatar(SequenciaMatricula.objects.get().ano, ultimo + i) for i in (1, 2)],
+        )
+        self.assertEqual(
+            list(Matricula.objects.filter(aluno__papel__pessoa__user__username__endswith='.import').order_by(
+                'aluno__papel__pessoa__nome').values_list('turma', flat=True)),
+            [turma.pk, outra.pk],
+        )
+        for t in (turma, outra):
+            t.refresh_from_db()
+            self.assertEqual(t.total_alunos, total_antes[t.pk] + 1)
+
+    def test_importacao_pela_tela(self):
+        self.client.force_login(self.escola['coordenador'])
+        arquivo = SimpleUploadedFile('alunos.csv', _csv(
+            'Ana Import;111.444.777-35;2014-03-02;ana.import;segredo1;;;',
+            'Sem Data;529.982.247-25;;sem.data;segredo2;;;',
+        ).read())
+        resposta = self.client.post(reverse('importar_alunos'), {'arquivo': arquivo}, follow=True)
+        self.assertEqual(resposta.resolver_match.url_name, 'situacao_importacao')
+        self.assertEqual(resposta.context['relatorio']['criados'], 1)
+        self.assertEqual(resposta.context['relatorio']['erros'], [
+            {'linha': 3, 'erros': ['data_nascimento: Este campo é obrigatório.']},
+        ])
+        self.assertTrue(User.objects.get(username='ana.import').check_password('segredo1'))
+
+    def test_arquivo_em_latin1(self):
+        arquivo = _csv('José;111.444.777-35;2014-03-02;jose.l1;senha;;;', codificacao='latin-1')
+        with self.assertRaisesMessage(ArquivoInvalido, 'não está em UTF-8'):
+            importar_alunos(arquivo)
+        self.assertFalse(User.objects.filter(username='jose.l1').exists())
+
+    def test_latin1_pela_tela(self):
+        self.client.force_login(self.escola['coordenador'])
+        arquivo = SimpleUploadedFile('alunos.csv', _csv('José;11144477735;2014-03-02;jose.l1;senha;;;', codificacao='latin-1').read())
+        resposta = self.client.post(reverse('importar_alunos'), {'arquivo': arquivo})
+        self.assertContains(resposta, 'não está em UTF-8')
+        self.assertFalse(User.objects.filter(username='jose.l1').exists())
+
+    def test_arquivo_grande_pela_tela(self):
+        # Mais linhas que um lote da tela: todas importadas, sem limite por arquivo
+        quantidade = TAMANHO_LOTE_WEB * 2 + 1
+        linhas = [f'Aluno {i};{i:011d};2014-03-02;aluno.lote{i};senha;;;' for i in range(1, quantidade + 1)]
+        self.client.force_login(self.escola['coordenador'])
+        arquivo = SimpleUploadedFile('alunos.csv', _csv(*linhas).read())
+        resposta = self.client.post(reverse('importar_alunos'), {'arquivo': arquivo}, follow=True)
+
+        self.assertEqual(resposta.context['situacao']['total'], quantidade)
+        self.assertEqual(resposta.context['relatorio']['criados'], quantidade)
+        self.assertEqual(resposta.context['situacao']['mensagem'], f'{quantidade} de {quantidade} linha(s) processadas.')
+        self.assertEqual(User.objects.filter(username__startswith='aluno.lote').count(), quantidade)
+
+    def test_situacao_inexistente(self):
+        self.client.force_login(self.escola['coordenador'])
+        resposta = self.client.get(reverse('situacao_importacao', kwargs={'identificador': 'nao-existe'}))
+        self.assertEqual(resposta.status_code, 404)
+
+    def test_cpf_em_formatos_diferentes(self):
+        Pessoa.objects.filter(pk=self.escola['aluno_info'].papel.pessoa_id).update(cpf='52998224725')
+        relatorio = importar_alunos(_csv(
+            'Ana;111.444.777-35;2014-03-02;ana.cpf;senha;;;',
+            'Bia;11144477735;2014-03-02;bia.cpf;senha;;;',
+            'Caio;529.982.247-25;2014-03-02;caio.cpf;senha;;;',
+            'Davi;123;2014-03-02;davi.cpf;senha;;;',
+        ))
+        self.assertEqual(relatorio['criados'], 1)
+        self.assertEqual(Pessoa.objects.get(user__username='ana.cpf').cpf, '111.444.777-35')
+        self.assertEqual(
+            [(erro['linha'], erro['erros']) for erro in relatorio['erros']],
+            [
+                (3, ['cpf: repetido no arquivo']),
+                (4, ['cpf: já cadastrado']),
+                (5, ['cpf: informe os 11 dígitos do CPF.']),
+            ],
+        )
+
+    def test_cadastro_concorrente_vira_erro_da_linha(self):
+        def hashes_com_concorrente(senhas, processos):
+            # Outro cadastro grava o mesmo username entre a validação e a gravação
+            User.objects.create_user('eva.concorrente')
+            return gerar_hashes(senhas, processos)
+
+        with mock.patch('contas.importacao.gerar_hashes', hashes_com_concorrente):
+            relatorio = importar_alunos(_csv(
+                'Eva;111.444.777-35;2014-03-02;eva.concorrente;senha;;;',
+                'Fabi;529.982.247-25;2014-03-02;fabi.import;senha;;;',
+            ))
+        self.assertEqual(relatorio['criados'], 1)
+        self.assertEqual(relatorio['erros'][0]['linha'], 2)
+        self.assertTrue(AlunoInfo.objects.filter(papel__pessoa__user__username='fabi.import').exists())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportacaoEmSegundoPlanoTests(TransactionTestCase):
+    """Fora de uma transação a importação pela tela roda numa thread e a requisição volta na hora"""
+
+    def test_andamento_ate_o_relatorio(self):
+        coordenador = gerar_escola_de_teste()['coordenador']
+        self.client.force_login(coordenador)
+        arquivo = SimpleUploadedFile('alunos.csv', _csv(
+            'Gil Fundo;111.444.777-35;2014-03-02;gil.fundo;senha;;;',
+        ).read())
+        resposta = self.client.post(reverse('importar_alunos'), {'arquivo': arquivo})
+        identificador = resposta.url.rstrip('/').rsplit('/', 1)[-1]
+
+        limite = time.monotonic() + 10
+        while situacao_importacao(identificador)['relatorio'] is None and time.monotonic() < limite:
+            time.sleep(0.05)
+
+        resposta = self.client.get(resposta.url)
+        self.assertEqual(resposta.context['relatorio']['criados'], 1)
+        self.assertTrue(User.objects.filter(username='gil.fundo').exists())
@@ -6,4 +6,6 @@ urlpatterns = [
     path('logout/', views.logout_view, name='contas_logout'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path("criar_usuario/", views.criar_usuario, name="criar_usuario"),
+    path("importar_alunos/", views.importar_alunos, name="importar_alunos"),
+    path("importar_alunos/<str:identificador>/", views.situacao_importacao_alunos, name="situacao_importacao"),
 ]
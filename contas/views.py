@@ -1,14 +1,23 @@
+from django.http import Http404
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from django.db.models import Sum
 from django.utils import timezone
 from datetime import date
+from functools import partial
 
-from contas.forms import CriarUsuarioForm
+from asgiref.sync import sync_to_async
+
+from contas.forms import CriarUsuarioForm, ImportarAlunosForm
+from contas.importacao import ArquivoInvalido, iniciar_importacao, situacao_importacao
+from contas.perfil import aobter_perfil, obter_perfil
 from pessoas.models import Pessoa, Papel, AlunoInfo, ProfessorInfo
-from academico.models import Turma, Chamada
+from academico.estatisticas import obter_estatisticas
+from academico.models import Turma, Chamada, Frequencia
+from POA.concorrencia import executar_concorrentes
 
 
 def login_view(request):
@@ -37,8 +46,7 @@ def criar_usuario(request):
     if request.user.is_superuser:
         has_permission = True
     else:
-        pessoa = getattr(request.user, "pessoa", None)
-        has_permission = pessoa and pessoa.papeis.filter(tipo=Papel.COORDENADOR).exists()
+        has_permission = obter_perfil(request, confirmado=True).is_coordenador
 
     if not has_permission:
         messages.error(request, "Apenas coordenadores podem criar usuários.")
@@ -89,25 +97,91 @@ def criar_usuario(request):
 
 
 @login_required
-def dashboard(request):
-    try:
-        pessoa = Pessoa.objects.get(user=request.user)
-    except Pessoa.DoesNotExist:
-        pessoa = None
+def importar_alunos(request):
+    if not (request.user.is_superuser or obter_perfil(request, confirmado=True).is_coordenador):
+        messages.error(request, "Apenas coordenadores podem importar alunos.")
+        return redirect("dashboard")
+
+    if request.method == "POST":
+        form = ImportarAlunosForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                identificador = iniciar_importacao(form.cleaned_data["arquivo"], form.cleaned_data["turma"])
+            except ArquivoInvalido as erro:
+                form.add_error("arquivo", str(erro))
+            else:
+                return redirect("situacao_importacao", identificador=identificador)
+    else:
+        form = ImportarAlunosForm()
+
+    return render(request, "contas/importar_alunos.html", {"form": form})
+
+
+@login_required
+def situacao_importacao_alunos(request, identificador):
+    if not (request.user.is_superuser or obter_perfil(request, confirmado=True).is_coordenador):
+        messages.error(request, "Apenas coordenadores podem importar alunos.")
+        return redirect("dashboard")
+
+    situacao = situacao_importacao(identificador)
+    if situacao is None:
+        raise Http404("Importação não encontrada.")
+    return render(request, "contas/situacao_importacao.html", {"situacao": situacao, "relatorio": situacao["relatorio"]})
+
+
+def _turmas_do_professor(pessoa_id):
+    # Turmas onde o professor leciona alguma disciplina
+    return list(
+        Turma.objects.filter(
+            ativa=True,
+            disciplinas__professor__papel__pessoa_id=pessoa_id,
+            disciplinas__professor__papel__ativo=True,
+        ).distinct().prefetch_related('disciplinas', 'disciplinas__professor').order_by('serie', 'nome')
+    )
+
+
+def _turmas_do_aluno(pessoa_id):
+    return list(Turma.objects.filter(
+        matriculas__aluno__papel__pessoa_id=pessoa_id,
+        matriculas__aluno__papel__ativo=True,
+        matriculas__ativa=True,
+    ))
+
+
+def _presencas_hoje(pessoa_id):
+    return Chamada.objects.filter(
+        aluno__papel__pessoa_id=pessoa_id,
+        aluno__papel__ativo=True,
+        data=date.today(),
+        presente=True
+    ).count()
+
+
+def _faltas_mes(pessoa_id):
+    return Frequencia.objects.filter(
+        aluno__papel__pessoa_id=pessoa_id,
+        aluno__papel__ativo=True,
+        mes=date.today().month,
+        ano=date.today().year
+    ).aggregate(total=Sum('total_faltas'))['total'] or 0
+
+
+@login_required
+async def dashboard(request):
+    pessoa = await aobter_perfil(request)
     
     if not pessoa:
-        return render(request, 'contas/dashboard.html', {
+        return await sync_to_async(render)(request, 'contas/dashboard.html', {
             'sem_vinculo': True,
             'user': request.user
         })
     
     # Determinar papéis do usuário
-    papeis_ativos = pessoa.papeis.filter(ativo=True)
-    tipos_papeis = list(papeis_ativos.values_list("tipo", flat=True))
+    tipos_papeis = pessoa.papeis
     
-    is_coordenador = Papel.COORDENADOR in tipos_papeis
-    is_professor = Papel.PROFESSOR in tipos_papeis
-    is_aluno = Papel.ALUNO in tipos_papeis
+    is_coordenador = pessoa.is_coordenador
+    is_professor = pessoa.is_professor
+    is_aluno = pessoa.is_aluno
     
     context = {
         'pessoa': pessoa,
@@ -116,61 +190,32 @@ def dashboard(request):
         'is_aluno': is_aluno,
         'papeis': tipos_papeis,
     }
-    
+
+    # Os dados de cada papel são independentes: as consultas rodam em paralelo
+    consultas = {}
+    if is_coordenador:
+        consultas['estatisticas'] = obter_estatisticas
+    if is_professor:
+        consultas['minhas_turmas'] = partial(_turmas_do_professor, pessoa.pessoa_id)
+    if is_aluno:
+        consultas['minhas_turmas_aluno'] = partial(_turmas_do_aluno, pessoa.pessoa_id)
+        consultas['presencas_hoje'] = partial(_presencas_hoje, pessoa.pessoa_id)
+        consultas['faltas_mes'] = partial(_faltas_mes, pessoa.pessoa_id)
+    resultados = dict(zip(consultas, await executar_concorrentes(*consultas.values())))
+
     # Dados para Coordenador
     if is_coordenador:
+        estatisticas = resultados.pop('estatisticas')
         context.update({
-            'total_alunos': AlunoInfo.objects.filter(papel__ativo=True).count(),
-            'total_professores': ProfessorInfo.objects.filter(papel__ativo=True).count(),
-            'total_turmas': Turma.objects.filter(ativa=True).count(),
-            'turmas_sem_professor': Turma.objects.filter(ativa=True, professor__isnull=True).count(),
+            'total_alunos': estatisticas['total_alunos'],
+            'total_professores': estatisticas['total_professores'],
+            'total_turmas': estatisticas['total_turmas'],
+            'turmas_sem_professor': estatisticas['turmas_sem_professor'],
         })
-    
+
     # Dados para Professor
     if is_professor:
-        try:
-            professor_info = ProfessorInfo.objects.get(papel__pessoa=pessoa, papel__ativo=True)
-            # Turmas onde o professor leciona alguma disciplina
-            turmas_professor = Turma.objects.filter(
-                ativa=True,
-                disciplinas__professor=professor_info
-            ).distinct().prefetch_related('disciplinas', 'disciplinas__professor').order_by('serie', 'nome')
-
-            context.update({
-                'minhas_turmas': turmas_professor,
-                'total_minhas_turmas': turmas_professor.count(),
-            })
-        except ProfessorInfo.DoesNotExist:
-            context.update({
-                'minhas_turmas': [],
-                'total_minhas_turmas': 0,
-            })
-        
-    # Dados para Aluno
-    if is_aluno:
-        try:
-            aluno_info = AlunoInfo.objects.get(papel__pessoa=pessoa, papel__ativo=True)
-            minhas_turmas = Turma.objects.filter(matriculas__aluno=aluno_info, matriculas__ativa=True)
-
-            context.update({
-                'minhas_turmas_aluno': minhas_turmas,
-                'presencas_hoje': Chamada.objects.filter(
-                    aluno=aluno_info,
-                    data=date.today(),
-                    presente=True
-                ).count(),
-                'faltas_mes': Chamada.objects.filter(
-                    aluno=aluno_info,
-                    data__month=date.today().month,
-                    data__year=date.today().year,
-                    presente=False
-                ).count(),
-            })
-        except AlunoInfo.DoesNotExist:
-            context.update({
-                'minhas_turmas_aluno': [],
-                'presencas_hoje': 0,
-                'faltas_mes': 0,
-            })
-    
-    return render(request, 'contas/dashboard.html', context)
+        resultados['total_minhas_turmas'] = len(resultados['minhas_turmas'])
+
+    context.update(resultados)
+    return await sync_to_async(render)(request, 'contas/dashboard.html', context)
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin
-from .models import Pessoa, Papel, AlunoInfo, ProfessorInfo
+from .models import Pessoa, Papel, AlunoInfo, ProfessorInfo, SequenciaMatricula
 
 # ---- Admin Pessoa ----
 @admin.register(Pessoa)
@@ -25,6 +25,9 @@ class AlunoInfoAdmin(admin.ModelAdmin):
     list_display = ['papel', 'matricula', 'data_ingresso']
     search_fields = ['papel__pessoa__nome', 'matricula']
     list_filter = ['data_ingresso']
+    list_select_related = ['papel__pessoa']
+    ordering = ['papel__pessoa__nome', 'id']
+    show_full_result_count = False
 
 # ---- Admin Professor ----
 @admin.register(ProfessorInfo)
@@ -32,6 +35,14 @@ class ProfessorInfoAdmin(admin.ModelAdmin):
     list_display = ['papel', 'codigo_funcional', 'formacao']
     search_fields = ['papel__pessoa__nome', 'codigo_funcional']
     list_filter = ['formacao']
+    list_select_related = ['papel__pessoa']
+    ordering = ['papel__pessoa__nome', 'id']
+
+# ---- Admin Sequência de Matrícula ----
+@admin.register(SequenciaMatricula)
+class SequenciaMatriculaAdmin(admin.ModelAdmin):
+    list_display = ['ano', 'ultimo']
+    ordering = ['-ano']
 
 # ---- Inline para vínculo User -> Pessoa ----
 class PessoaInline(admin.StackedInline):
@@ -0,0 +1,65 @@
+"""
+Busca de pessoas por nome, e-mail ou matrícula, sem diferenciar acentos.
+
+No PostgreSQL usa os índices de trigramas criados na migração 0004 (pg_trgm +
+unaccent), então tanto "joao" quanto "joão silv" encontram "João da Silva" sem
+varrer a tabela. As expressões aqui precisam ser idênticas às dos índices.
+"""
+import unicodedata
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import CharField, FloatField, Func, Q, Value
+from django.db.models.functions import Lower
+
+from .models import AlunoInfo, Pessoa
+
+
+class SemAcento(Func):
+    """unaccent() envolvido em uma função IMMUTABLE, o que permite indexá-lo"""
+    function = 'imutavel_unaccent'
+    output_field = CharField()
+
+
+def normalizar(texto):
+    """Mesma normalização dos índices (minúsculas e sem acentos), feita no Python"""
+    return ''.join(
+        c for c in unicodedata.normalize('NFKD', texto.strip().lower())
+        if not unicodedata.combining(c)
+    )
+
+
+def buscar_alunos(queryset, termo):
+    """
+    Filtra um queryset de AlunoInfo pelo termo e anota a `relevancia` de cada
+    resultado (similaridade do termo com o nome), para ordenação.
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.filter(
+            Q(papel__pessoa__nome__icontains=termo) |
+            Q(matricula__icontains=termo) |
+            Q(papel__pessoa__email__icontains=termo)
+        ).annotate(relevancia=Value(0.0, output_field=FloatField()))
+
+    termo = normalizar(termo)
+    # Cada subconsulta filtra uma única tabela, para que o planejador combine
+    # os índices de trigramas dela (BitmapOr); um OR entre colunas de pessoa e
+    # de aluno depois do JOIN não pode usar nenhum deles
+    pessoas = Pessoa.objects.annotate(
+        nome_busca=SemAcento(Lower('nome')),
+        email_busca=Lower('email'),
+    ).filter(
+        Q(nome_busca__trigram_word_similar=termo) |
+        Q(nome_busca__contains=termo) |
+        Q(email_busca__contains=termo)
+    ).values('pk')
+    por_matricula = AlunoInfo.objects.annotate(
+        matricula_busca=Lower('matricula'),
+    ).filter(matricula_busca__contains=termo).values('pk')
+
+    return queryset.filter(
+        Q(papel__pessoa__in=pessoas) | Q(pk__in=por_matricula)
+    ).annotate(
+        nome_busca=SemAcento(Lower('papel__pessoa__nome')),
+        relevancia=TrigramWordSimilarity(termo, 'nome_busca'),
+    )
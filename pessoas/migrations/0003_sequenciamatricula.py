@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pessoas', '0002_alter_alunoinfo_matricula'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenciaMatricula',
+            fields=[
+                ('ano', models.IntegerField(primary_key=True, serialize=False, verbose_name='Ano')),
+                ('ultimo', models.PositiveIntegerField(default=0, verbose_name='Último sequencial')),
+            ],
+            options={
+                'verbose_name': 'Sequência de matrícula',
+                'verbose_name_plural': 'Sequências de matrícula',
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+
+# unaccent() é STABLE e não pode ser usado em índices; o invólucro IMMUTABLE
+# fixa o dicionário e torna a expressão indexável (usado por pessoas.busca)
+CRIAR = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    CREATE OR REPLACE FUNCTION imutavel_unaccent(text) RETURNS text AS $$
+        SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """,
+    "CREATE INDEX IF NOT EXISTS pessoa_nome_trgm ON pessoas_pessoa "
+    "USING gin (imutavel_unaccent(lower(nome)) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS pessoa_email_trgm ON pessoas_pessoa "
+    "USING gin (lower(email) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS alunoinfo_matricula_trgm ON pessoas_alunoinfo "
+    "USING gin (lower(matricula) gin_trgm_ops)",
+]
+
+REMOVER = [
+    "DROP INDEX IF EXISTS alunoinfo_matricula_trgm",
+    "DROP INDEX IF EXISTS pessoa_email_trgm",
+    "DROP INDEX IF EXISTS pessoa_nome_trgm",
+    "DROP FUNCTION IF EXISTS imutavel_unaccent(text)",
+]
+
+
+def _executar(comandos):
+    def operacao(apps, schema_editor):
+        # Os recursos são do PostgreSQL; em outros bancos a busca usa icontains
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for comando in comandos:
+            schema_editor.execute(comando)
+    return operacao
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pessoas', '0003_sequenciamatricula'),
+    ]
+
+    operations = [
+        migrations.RunPython(_executar(CRIAR), _executar(REMOVER)),
+    ]
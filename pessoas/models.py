@@ -1,5 +1,6 @@
 from datetime import date
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
 from django.utils import timezone
 
@@ -17,6 +18,13 @@ class Pessoa(models.Model):
     atualizado_em = models.DateTimeField(auto_now=True)
     #implementar validações?
 
+    class Meta:
+        indexes = [
+            # Ordenação das listagens por nome e elegibilidade por data de nascimento
+            models.Index(fields=['nome', 'id'], name='pessoa_nome_idx'),
+            models.Index(fields=['data_nascimento'], name='pessoa_nascimento_idx'),
+        ]
+
     @property
     def idade(self):
         hoje = date.today()
@@ -48,6 +56,70 @@ class Papel(models.Model):
     def __str__(self):
         return f"{self.pessoa.nome} - {self.get_tipo_display()}"
 
+#Contador de matrículas por ano, reservado em blocos para evitar disputa na geração
+class SequenciaMatricula(models.Model):
+    ano = models.IntegerField(primary_key=True, verbose_name='Ano')
+    ultimo = models.PositiveIntegerField(default=0, verbose_name='Último sequencial')
+
+    class Meta:
+        verbose_name = 'Sequência de matrícula'
+        verbose_name_plural = 'Sequências de matrícula'
+
+    def __str__(self):
+        return f"{self.ano}: {self.ultimo}"
+
+    @staticmethod
+    def formatar(ano, sequencial):
+        # Ano + sequencial com zeros à esquerda (cresce além de 4 dígitos se preciso)
+        return f"{ano}{sequencial:04d}"
+
+    @classmethod
+    def _maior_existente(cls, ano):
+        # Continua a numeração das matrículas geradas antes do contador existir
+        sequenciais = [
+            int(matricula[len(str(ano)):])
+            for matricula in AlunoInfo.objects.filter(matricula__startswith=str(ano)).values_list('matricula', flat=True)
+            if matricula[len(str(ano)):].isdigit()
+        ]
+        return max(sequenciais, default=0)
+
+    @classmethod
+    def reservar(cls, quantidade=1, ano=None):
+        """
+        Reserva um bloco contínuo de sequenciais para o ano e devolve o range.
+        O incremento é um único UPDATE atômico, então requisições concorrentes
+        nunca recebem o mesmo número.
+
+        A linha do ano fica travada até o commit da transação mais externa:
+        reserve antes de abrir transações longas (importações, geração em
+        lote), senão todo cadastro de aluno espera por elas. Números não usados
+        por causa de um rollback ficam como lacunas.
+        """
+        ano = ano or timezone.now().year
+        with transaction.atomic():
+            if not cls.objects.filter(ano=ano).update(ultimo=F('ultimo') + quantidade):
+                cls.objects.bulk_create([cls(ano=ano, ultimo=cls._maior_existente(ano))], ignore_conflicts=True)
+                cls.objects.filter(ano=ano).update(ultimo=F('ultimo') + quantidade)
+            ultimo = cls.objects.filter(ano=ano).values_list('ultimo', flat=True).get()
+        return range(ultimo - quantidade + 1, ultimo + 1)
+
+    @classmethod
+    def proximas_matriculas(cls, quantidade=1, ano=None):
+        ano = ano or timezone.now().year
+        return [cls.formatar(ano, sequencial) for sequencial in cls.reservar(quantidade, ano)]
+
+    @classmethod
+    def ainda_nao_emitida(cls, matricula):
+        """
+        Indica se a matrícula tem o formato ano + sequencial de um ano com
+        contador e está acima do último número emitido: gravada à mão, ela
+        colidiria com uma matrícula gerada depois.
+        """
+        if not (matricula.isdigit() and len(matricula) >= 8):
+            return False
+        ultimo = cls.objects.filter(ano=int(matricula[:4])).values_list('ultimo', flat=True).first()
+        return ultimo is not None and int(matricula[4:]) > ultimo
+
 #Um aluno COMPÕE suas informações + informações do seu papel + informações do usuario
 class AlunoInfo(models.Model):
     papel = models.OneToOneField(Papel, on_delete=models.CASCADE, related_name='aluno_info')
@@ -56,16 +128,8 @@ class AlunoInfo(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.matricula:
-            ano = timezone.now().year
-            # Pega o último número sequencial para o ano atual
-            ultimas = AlunoInfo.objects.filter(matricula__startswith=str(ano)).order_by('-matricula')
-            if ultimas.exists():
-                ultimo_numero = int(ultimas.first().matricula[-4:])
-                sequencial = ultimo_numero + 1
-            else:
-                sequencial = 1
-            # Gera matrícula com zeros à esquerda
-            self.matricula = f"{ano}{sequencial:04d}"
+            # Para cadastros em lote, reserve o bloco com SequenciaMatricula.proximas_matriculas(n)
+            self.matricula = SequenciaMatricula.proximas_matriculas()[0]
         super().save(*args, **kwargs)
     
     def __str__(self):